@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+tkcolorpicker - Alternative to colorchooser for Tkinter.
+Copyright 2017 Juliette Monsel <j_4321@protonmail.com>
+
+tkcolorpicker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+tkcolorpicker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Micro-benchmarks
+"""
+
+from timeit import timeit
+import tkcolorpicker.core as tkcore
+
+
+def _rgb_to_hexa_format(*args):
+    """Former implementation of rgb_to_hexa."""
+    return ("#%2.2x%2.2x%2.2x" % tuple(args)).upper()
+
+
+def bench(name, func, ref, number=100000):
+    """Print the time per call of func and ref and the speedup."""
+    t = timeit(func, number=number) / number * 1e6
+    t_ref = timeit(ref, number=number) / number * 1e6
+    print("%-28s %8.3f us  (reference %8.3f us, x%.1f)" % (name, t, t_ref, t_ref / t))
+
+
+if __name__ == '__main__':
+    bench("hue2col (integer hue)", lambda: tkcore.hue2col(217),
+          lambda: tkcore._hue2col_colorsys(217))
+    bench("hue2col (fractional hue)", lambda: tkcore.hue2col(217.3),
+          lambda: tkcore._hue2col_colorsys(217.3))
+    bench("rgb_to_hexa", lambda: tkcore.rgb_to_hexa(12, 200, 97),
+          lambda: _rgb_to_hexa_format(12, 200, 97))
@@ -10,7 +10,7 @@ with open(path.join(here, 'README.rst'), encoding='utf-8') as f:
 
 setup(
     name='tkcolorpicker',
-    version='2.1.3',
+    version='2.2.0',
     description='Color picker dialog for Tkinter',
     long_description=long_description,
     url='https://github.com/j4321/tkColorPicker',
@@ -35,5 +35,6 @@ setup(
     keywords=['tkinter', 'color', 'colorchooser'],
     py_modules=["tkcolorpicker"],
     packages=["tkcolorpicker"],
-    install_requires=['Pillow']
+    install_requires=['Pillow'],
+    extras_require={'numpy': ['numpy']}
 )
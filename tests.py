@@ -20,14 +20,25 @@ Tests
 """
 
 import unittest
+import os
+import sys
+import subprocess
+import shutil
+import tempfile
+import warnings
 try:
     import Tkinter as tk
 except ImportError:
     import tkinter as tk
 import tkcolorpicker as tkc
+import tkcolorpicker.core as tkcore
 import tkcolorpicker.functions as tkf
+import tkcolorpicker.colorspec as tkcs
 from tkcolorpicker.spinbox import Spinbox
 from tkcolorpicker.limitvar import LimitVar
+from tkcolorpicker.palette import Palette
+import tkcolorpicker.history as tkhistory
+from tkcolorpicker.history import ColorHistory
 
 
 class TestFunctions(unittest.TestCase):
@@ -45,6 +56,10 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(tkf.rgb_to_hexa(255, 255, 255), "#FFFFFF")
         self.assertEqual(tkf.rgb_to_hexa(255, 255, 255, 255), "#FFFFFFFF")
         self.assertRaises(ValueError, tkf.rgb_to_hexa, 255, 255)
+        self.assertEqual(tkf.rgb_to_hexa(256, 10, 0), "#1000A00")
+        for args in [(0, 10, 255), (1, 2, 3, 4), (171, 205, 239)]:
+            self.assertEqual(tkf.rgb_to_hexa(*args),
+                             ("#" + "%2.2x" * len(args) % args).upper())
 
     def test_hexa_to_rgb(self):
         self.assertEqual(tkf.hexa_to_rgb("#FFFFFF"), (255, 255, 255))
@@ -53,21 +68,320 @@ class TestFunctions(unittest.TestCase):
 
     def test_hue2col(self):
         self.assertEqual(tkf.hue2col(0), (255, 0, 0))
+        for h in [0, 17, 60, 359, 360, 0.5, 17.3, 60., 123.456, 359.99]:
+            self.assertEqual(tkf.hue2col(h), tkcore._hue2col_colorsys(h))
         self.assertRaises(ValueError, tkf.hue2col, 365)
         self.assertRaises(ValueError, tkf.hue2col, -20)
 
     def test_col2hue(self):
         self.assertEqual(tkf.col2hue(255, 0, 0), 0)
 
+    def test_color_square_data(self):
+
+        def reference(hue, width, height):
+            r, g, b = tkf.hue2col(hue)
+            h = float(height - 1)
+            w = float(width - 1)
+            c = [(r + i / h * (255 - r), g + i / h * (255 - g), b + i / h * (255 - b)) for i in range(height)]
+            data = []
+            for i in range(height):
+                for j in range(width):
+                    data.extend(tkf.round2(j / w * c[i][k]) for k in range(3))
+            return bytes(bytearray(data))
+
+        renderers = [tkcore._color_square_data_python]
+        if tkcore._get_numpy() is not None:
+            renderers.append(tkcore._color_square_data_numpy)
+        for hue in (0, 37, 60, 181, 360):
+            ref = reference(hue, 23, 17)
+            self.assertEqual(tkf.color_square_data(hue, 23, 17), ref)
+            for renderer in renderers:
+                self.assertEqual(renderer(tkf.hue2col(hue), 23, 17, 22., 16.), ref)
+        self.assertEqual(len(tkf.color_square_data(0, 1, 1)), 3)
+        data = tkf.color_square_data(37, 23, 17)
+        for i in range(17):
+            for j in range(23):
+                k = 3 * (23 * i + j)
+                self.assertEqual(tkf.color_square_pixel(37, j, i, 23, 17),
+                                 tuple(bytearray(data[k:k + 3])))
+        self.assertTrue(tkf.ppm_data(b"\x00" * 12, 2, 2).startswith(b"P6 2 2 255\n"))
+
+    def test_array_conversions(self):
+        rgb = [(r, g, b, 255) for r in range(0, 256, 15)
+               for g in range(0, 256, 17) for b in range(0, 256, 51)]
+        hsv = [(h, s, v) for h in range(0, 361, 7)
+               for s in range(0, 101, 9) for v in range(0, 101, 11)]
+        hexa = [tkf.rgb_to_hexa(*c) for c in rgb]
+        self.assertEqual([tuple(c) for c in tkf.rgb_to_hsv_array(rgb)],
+                         [tkf.rgb_to_hsv(*c[:3]) for c in rgb])
+        self.assertEqual([tuple(c) for c in tkf.hsv_to_rgb_array(hsv)],
+                         [tkf.hsv_to_rgb(*c) for c in hsv])
+        self.assertEqual(list(tkf.rgb_to_hexa_array(rgb)), hexa)
+        self.assertEqual([tuple(c) for c in tkf.hexa_to_rgb_array(hexa)], rgb)
+        self.assertEqual(list(tkf.col2hue_array(rgb)),
+                         [tkf.col2hue(*c[:3]) for c in rgb])
+        self.assertRaises(ValueError, tkf.hexa_to_rgb_array, ["#FFFFFF", "#FFF"])
+        # floats are rejected like by rgb_to_hexa
+        self.assertRaises(TypeError, tkf.rgb_to_hexa, 1.7, 2, 3)
+        self.assertRaises(TypeError, tkf.rgb_to_hexa_array, [(1.7, 2, 3)])
+        if tkcore._get_numpy() is not None:
+            self.assertRaises(ValueError, tkf.rgb_to_hexa_array, [(256, 0, 0)])
+            self.assertRaises(ValueError, tkf.rgb_to_hsv_array, (1, 2, 3))
+            self.assertRaises(ValueError, tkf.rgb_to_hexa_array, [(1, 2)])
+            self.assertEqual(len(tkf.rgb_to_hexa_array(tkcore.np.zeros((0, 3)))), 0)
+
+    def test_color_state(self):
+        state = tkf.ColorState((255, 0, 0))
+        self.assertEqual(state, ((255, 0, 0), (0, 100, 100), None, '#FF0000'))
+        state = state.with_alpha(100)
+        self.assertEqual(state.hexa, '#FF000064')
+        state = tkf.ColorState.from_hsv((60, 100, 0), 255)
+        self.assertEqual(state, ((0, 0, 0), (60, 100, 0), 255, '#000000FF'))
+        self.assertRaises(AttributeError, setattr, state, 'alpha', 0)
+
+    def test_color(self):
+        # from_hsv must not alter the shared instance of black
+        self.assertEqual(tkcore.Color.from_hsv(120, 100, 0).hsv, (0, 0, 0))
+        self.assertEqual(tkcore.Color(0, 0, 0).hsv, (0, 0, 0))
+        color = tkcore.Color(255, 0, 0)
+        # named colors are interned, other colors are not
+        self.assertIs(color, tkcore.Color(255, 0, 0))
+        self.assertIsNot(tkcore.Color(1, 2, 3), tkcore.Color(1, 2, 3))
+        self.assertFalse(hasattr(tkcore.Color(1, 2, 3), '__dict__'))
+        self.assertIs(tkf.Color, tkcore.Color)
+        r, g, b = color
+        self.assertEqual((r, g, b), (255, 0, 0))
+        self.assertEqual(color, (255, 0, 0))
+        self.assertEqual(hash(color), hash((255, 0, 0)))
+        self.assertEqual(color.hsv, (0, 100, 100))
+        self.assertEqual(color.hexa, '#FF0000')
+        self.assertIsNone(color.alpha)
+        self.assertEqual(color.value, 0xFF0000FF)
+        self.assertRaises(AttributeError, setattr, color, '_value', 0)
+        color = tkcore.Color(0, 255, 0, 20)
+        self.assertEqual(len(color), 4)
+        self.assertEqual(color[:3], (0, 255, 0))
+        self.assertEqual(color.hexa, '#00FF0014')
+        self.assertNotEqual(color, tkcore.Color(0, 255, 0))
+        self.assertEqual(color.with_alpha(None), tkcore.Color(0, 255, 0))
+        self.assertEqual(tkcore.Color.from_hexa('#00FF0014'), color)
+        self.assertEqual(tkcore.Color.from_hsv(120, 100, 100), (0, 255, 0))
+        self.assertEqual(repr(color), 'Color(0, 255, 0, 20)')
+        self.assertRaises(ValueError, tkcore.Color, 256, 0, 0)
+        self.assertRaises(ValueError, tkcore.Color, 0.5, 0, 0)
+        self.assertRaises(ValueError, tkcore.Color, 1.5, 2, 3)
+        self.assertRaises(ValueError, tkcore.Color, 1, 2, 3, 4.0)
+        # the cached HSV and hexadecimal values are derived from RGB
+        color = tkcore.Color.from_hsv(0, 0, 0)
+        self.assertEqual((color.hsv, color.hexa), ((0, 0, 0), '#000000'))
+        self.assertIs(color.hsv, color.hsv)
+        self.assertEqual(tkcore.Color.from_hsv(200, 50, 0).hsv, (0, 0, 0))
+
+    def test_parse_color(self):
+        parse = tkcs.parse_color
+        # short forms follow Tk: #F00 is #F000 0000 0000 in 16 bits
+        self.assertEqual(parse("#f00"), ((239, 0, 0), None))
+        self.assertEqual(parse("#fff"), ((239, 239, 239), None))
+        self.assertEqual(parse("#F008"), ((239, 0, 0), 136))
+        self.assertEqual(parse("#F00F"), ((239, 0, 0), 255))
+        self.assertEqual(parse("#fff000000"), ((255, 0, 0), None))
+        self.assertEqual(parse("#FF0000"), ((255, 0, 0), None))
+        self.assertEqual(parse("#ff000080"), ((255, 0, 0), 128))
+        self.assertEqual(parse("#ffff00000000"), ((255, 0, 0), None))
+        self.assertEqual(parse("rgb(255, 0, 0)"), ((255, 0, 0), None))
+        self.assertEqual(parse("rgba(100%, 0, 0, 0.5)"), ((255, 0, 0), 128))
+        self.assertEqual(parse("hsl(120, 100%, 50%)"), ((0, 255, 0), None))
+        self.assertEqual(parse("hsla(240deg 100% 50% / 1)"), ((0, 0, 255), 255))
+        self.assertEqual(parse("Alice Blue"), ((240, 248, 255), None))
+        self.assertEqual(parse("saddlebrown"), ((139, 69, 19), None))
+        self.assertEqual(parse((1, 2, 3, 4)), ((1, 2, 3), 4))
+        self.assertEqual(parse([1, 2, 3]), ((1, 2, 3), None))
+        self.assertEqual(parse(u"#FF0000"), ((255, 0, 0), None))
+        for color in tkf.PALETTE:
+            self.assertIn(tkcs.normalize_name(color), tkcs.COLOR_NAMES)
+        for color in ("unknown", "#12345", "rgb(300, 0, 0)", "hsl(0, 0)",
+                      (1, 2), (0, 0, 256), (1.5, 2, 3), None):
+            self.assertRaises(ValueError, parse, color)
+
+    def test_color_name_index(self):
+        index = tkf.ColorNameIndex()
+        self.assertEqual(index.nearest((255, 0, 0)), ('red', (255, 0, 0), 0))
+        self.assertEqual(index.nearest((250, 2, 0))[:2], ('red', (255, 0, 0)))
+        palette = [("black", (0, 0, 0)), ("white", (255, 255, 255)),
+                   ("blue", (0, 0, 255)), ("noir", (0, 0, 0))]
+        index = tkf.ColorNameIndex(palette)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.nearest((0, 0, 120))[0], 'black')
+        self.assertEqual(tkf.ColorNameIndex(palette, "lab").nearest((0, 0, 120))[0],
+                         'blue')
+        index = tkf.ColorNameIndex(palette, lambda r, g, b: (r + g + b,))
+        self.assertEqual(index.nearest((255, 255, 100))[0], 'white')
+        self.assertRaises(ValueError, tkf.ColorNameIndex, palette, "xyz")
+        # compare with a linear scan
+        palette = [("c%i" % i, ((i * 37) % 256, (i * 91) % 256, (i * 13) % 256))
+                   for i in range(500)]
+        index = tkf.ColorNameIndex(palette)
+        for color in [(0, 0, 0), (12, 200, 97), (255, 128, 3), (64, 64, 250)]:
+            dist = min(sum((a - b) ** 2 for a, b in zip(color, rgb))
+                       for name, rgb in palette)
+            self.assertAlmostEqual(index.nearest(color)[2] ** 2, dist)
+
+    def test_color_history(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            history = ColorHistory(os.path.join(tmpdir, 'dir', 'history'), 3)
+            self.assertEqual(history.load(), [])
+            for color in [(1, 2, 3), (4, 5, 6, 7), (1, 2, 3), (8, 9, 10)]:
+                history.add(color)
+            self.assertEqual(history.load(),
+                             [(8, 9, 10, 255), (1, 2, 3, 255), (4, 5, 6, 7)])
+            self.assertEqual(os.path.getsize(history.path), 16)
+            # incomplete record left by an interrupted write
+            with open(history.path, 'ab') as f:
+                f.write(b'\x01\x02')
+            self.assertEqual(history.load()[0], (8, 9, 10, 255))
+            history.compact()
+            self.assertEqual(os.path.getsize(history.path), 12)
+            self.assertEqual(history.load(),
+                             [(8, 9, 10, 255), (1, 2, 3, 255), (4, 5, 6, 7)])
+            # automatic compaction
+            for i in range(100):
+                history.add((i, 0, 0))
+            self.assertLess(os.path.getsize(history.path), 100 * 4)
+            self.assertEqual(history.load(),
+                             [(99, 0, 0, 255), (98, 0, 0, 255), (97, 0, 0, 255)])
+            history.clear()
+            self.assertEqual(history.load(), [])
+            # the directory is created by all the writing methods
+            history = ColorHistory(os.path.join(tmpdir, 'new', 'history'), 3)
+            history.compact()
+            self.assertEqual(history.load(), [])
+            history = ColorHistory(os.path.join(tmpdir, 'new2', 'history'), 3)
+            history.clear()
+            self.assertTrue(os.path.isdir(os.path.join(tmpdir, 'new2')))
+            # without file locking, the log is not compacted automatically
+            fcntl = tkhistory.fcntl
+            tkhistory.fcntl = None
+            try:
+                for i in range(100):
+                    history.add((i, 0, 0))
+            finally:
+                tkhistory.fcntl = fcntl
+            self.assertEqual(os.path.getsize(history.path), 100 * 4)
+            self.assertEqual(history.load(),
+                             [(99, 0, 0, 255), (98, 0, 0, 255), (97, 0, 0, 255)])
+            history.compact()
+            self.assertEqual(os.path.getsize(history.path), 12)
+            # replacing an existing file
+            tmp = os.path.join(tmpdir, 'tmp')
+            with open(tmp, 'wb') as f:
+                f.write(b'\x01\x02\x03\x04')
+            tkhistory._replace(tmp, history.path)
+            self.assertFalse(os.path.exists(tmp))
+            self.assertEqual(history.load(), [(1, 2, 3, 4)])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_lru_cache(self):
+        cache = tkf.LRUCache(10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, 4)
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))
+        cache.put("d", 4, 20)
+        self.assertNotIn("d", cache)
+        info = cache.info()
+        self.assertEqual((info["hits"], info["misses"], info["evictions"]), (1, 1, 1))
+        self.assertEqual((info["count"], info["size"]), (2, 8))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_hue_strip_data(self):
+        data = tkf.hue_strip_data(200)
+        self.assertEqual(len(data), 600)
+        for i in range(200):
+            self.assertEqual(tuple(bytearray(data[3 * i:3 * i + 3])),
+                             tkf.hue2col(float(i) / 200 * 360))
+
     def test_create_checkered_image(self):
-        tkf.create_checkered_image(100, 100, (155, 120, 10, 255),
-                                   (0, 0, 0, 255), s=8)
+        im = tkf.create_checkered_image(100, 100, (155, 120, 10, 255),
+                                           (0, 0, 0, 255), s=8)
+        self.assertEqual(im.size, (100, 100))
+        self.assertEqual(im.getpixel((0, 0)), (155, 120, 10, 255))
+        self.assertEqual(im.getpixel((8, 0)), (0, 0, 0, 255))
+        self.assertEqual(im.getpixel((8, 8)), (155, 120, 10, 255))
+        self.assertEqual(im.getpixel((99, 90)), (0, 0, 0, 255))
+        shared = tkf.get_checkered_image(100, 100, (155, 120, 10, 255),
+                                            (0, 0, 0, 255), s=8)
+        self.assertIs(shared, tkf.get_checkered_image(100, 100, (155, 120, 10, 255),
+                                                         (0, 0, 0, 255), s=8))
+        self.assertIsNot(im, shared)
+        self.assertEqual(im.tobytes(), shared.tobytes())
 
     def test_overlay(self):
         im = tkf.create_checkered_image(200, 200)
         tkf.overlay(im, (255, 0, 0, 100))
 
 
+
+class TestCore(unittest.TestCase):
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     "the package imports the widgets before python 3.7")
+    def test_core_without_tkinter(self):
+        code = ("import sys, tkcolorpicker.core, tkcolorpicker.colorspec, "
+                "tkcolorpicker.history; "
+                "print('tkinter' in sys.modules or 'Tkinter' in sys.modules)")
+        out = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(out.strip(), b"False")
+
+    def test_functions_reexports(self):
+        for name in ["PALETTE", "round2", "rgb_to_hsv", "hue2col",
+                     "rgb_to_hexa_array", "ColorState", "LRUCache",
+                     "ColorNameIndex", "color_square_data", "checkered_data",
+                     "get_checkered_image", "overlay"]:
+            self.assertIs(getattr(tkf, name), getattr(tkcore, name))
+
+    def test_renderer(self):
+        self.assertIn(tkcore.get_renderer(), ("numpy", "python"))
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            self.assertEqual(tkf.RENDERER, tkcore.get_renderer())
+        if sys.version_info >= (3, 7):
+            self.assertTrue(issubclass(w[-1].category, DeprecationWarning))
+
+    def test_checkered_data(self):
+        data = tkcore.checkered_data(3, 2, (1, 1, 1, 1), (2, 2, 2, 2), s=1)
+        self.assertEqual(data, b'\x01' * 4 + b'\x02' * 4 + b'\x01' * 4 +
+                         b'\x02' * 4 + b'\x01' * 4 + b'\x02' * 4)
+        self.assertEqual(tkcore.create_checkered_image(3, 2, (1, 1, 1, 1),
+                                                       (2, 2, 2, 2), s=1).tobytes(),
+                         data)
+
+
+def imported_modules(code):
+    """Return the names of the modules imported after executing code."""
+    code += "\nimport sys\nprint(' '.join(sys.modules))"
+    out = subprocess.check_output([sys.executable, "-c", code])
+    return set(out.decode().split())
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "requires module __getattr__")
+class TestImportTime(unittest.TestCase):
+    def test_import_package(self):
+        modules = imported_modules("import tkcolorpicker")
+        self.assertIn("tkcolorpicker", modules)
+        for module in ["tkinter", "PIL", "numpy", "tkcolorpicker.colorpicker"]:
+            self.assertNotIn(module, modules)
+
+    def test_import_colorpicker(self):
+        modules = imported_modules("import tkcolorpicker.colorpicker")
+        self.assertIn("tkcolorpicker.colorpicker", modules)
+        for module in ["PIL", "numpy", "locale", "tkcolorpicker.alphabar"]:
+            self.assertNotIn(module, modules)
+
+
 class BaseWidgetTest(unittest.TestCase):
     def setUp(self):
         self.window = tk.Tk()
@@ -103,6 +417,22 @@ class TestSpinbox(BaseWidgetTest):
         event = TestEvent(widget=spinbox.frame)
         spinbox.focusin(event)
         spinbox.focusout(event)
+        self.assertEqual(spinbox.frame.state(), ())
+
+    def test_spinbox_shared_style(self):
+        spinboxes = [Spinbox(self.window, from_=0, to=10) for i in range(5)]
+        for spinbox in spinboxes:
+            spinbox.grid()
+            self.assertEqual(spinbox.frame.cget('style'), 'ttkSpinbox.TFrame')
+        self.window.update()
+        self.assertEqual(list(self.window._root()._spinbox_themes),
+                         [tkf.ttk.Style(self.window).theme_use()])
+        spinbox = spinboxes[0]
+        spinbox.focusin(TestEvent(widget=spinbox.frame))
+        self.assertIn('focus', spinbox.frame.state())
+        self.assertNotIn('focus', spinboxes[1].frame.state())
+        spinbox.focusout(TestEvent(widget=spinbox.frame))
+        self.assertNotIn('focus', spinbox.frame.state())
 
 
 class TestLimitVar(BaseWidgetTest):
@@ -144,6 +474,38 @@ class TestLimitVar(BaseWidgetTest):
         self.assertEqual(var.get(), 0)
         self.assertEqual(tk.StringVar.get(var), '0')
 
+    def test_limitvar_cache(self):
+        var = LimitVar(0, 100, self.window, 10)
+        self.window.setvar(str(var), '42')
+        self.assertEqual(var.get(), 42)
+        # invalid content: the last valid value is kept and nothing is written
+        self.window.setvar(str(var), '')
+        self.assertEqual(var.get(), 42)
+        self.assertEqual(tk.StringVar.get(var), '')
+        self.assertTrue(var.validate(''))
+        self.assertTrue(var.validate('100'))
+        self.assertFalse(var.validate('101'))
+        self.assertFalse(var.validate('-1'))
+        self.assertFalse(var.validate('1a'))
+        self.assertFalse(var.validate(u'\u00b2'))
+        var.set(250)
+        self.assertEqual((var.get(), tk.StringVar.get(var)), (100, '100'))
+        self.assertFalse(var._writing)
+
+    def test_limitvar_spinbox(self):
+        var = LimitVar(0, 100, self.window, 10)
+        spinbox = Spinbox(self.window, from_=0, to=100, textvariable=var)
+        spinbox.pack()
+        self.window.update()
+        self.assertEqual(spinbox.cget('validate'), 'key')
+        spinbox.delete(0, 'end')
+        spinbox.insert(0, '1a')
+        self.assertEqual(spinbox.get(), '')
+        spinbox.insert(0, '200')
+        self.assertEqual(spinbox.get(), '')
+        spinbox.insert(0, '20')
+        self.assertEqual(var.get(), 20)
+
 
 class TestColorSquare(BaseWidgetTest):
     def test_colorsquare_init(self):
@@ -162,6 +524,36 @@ class TestColorSquare(BaseWidgetTest):
         cs._on_move(event)
         self.assertEqual(cs.get(), ((255, 0, 0), (0, 100, 100), '#FF0000'))
 
+    def test_colorsquare_subscribe(self):
+        cs = tkc.ColorSquare(self.window, hue=0, height=200, width=200)
+        cs.pack()
+        self.window.update()
+        colors = []
+        throttled = []
+        cs.subscribe(colors.append)
+        cs.subscribe(throttled.append, throttle=10000)
+        event = TestEvent(x=0, y=0)
+        cs._on_click(event)
+        event.x = cs.winfo_width()
+        cs._on_move(event)
+        self.window.update()
+        red = tkf.ColorState((255, 0, 0), (0, 100, 100))
+        self.assertEqual(colors, [red])
+        self.assertEqual(throttled, [red])
+        cs.set_hue(120)
+        self.window.update()
+        self.assertEqual(colors[-1].rgb, (0, 255, 0))
+        # the throttled callback will be called later with the last color
+        self.assertEqual(throttled, [red])
+        self.assertIsNotNone(list(cs._subscribers.values())[1].after_id)
+
+    def test_colorsquare_get_color(self):
+        cs = tkc.ColorSquare(self.window, hue=0, height=200, width=200)
+        cs.pack()
+        self.window.update()
+        cs._on_click(TestEvent(x=cs.winfo_width(), y=0))
+        self.assertIs(cs.get(as_color=True), tkc.Color(255, 0, 0))
+
     def test_colorsquare_functions(self):
         cs = tkc.ColorSquare(self.window, hue=60, height=200, width=200)
         cs.pack()
@@ -181,9 +573,59 @@ class TestColorSquare(BaseWidgetTest):
         cs.set_hsv((0, 100, 100))
         self.assertEqual(cs.get_hue(), 0)
         self.window.update()
+        cs._draw((0, 100, 100))
+        self.assertEqual(cs.check_items(), 3)
         self.assertEqual(cs.get(), ((255, 0, 0), (0, 100, 100), '#FF0000'))
         self.window.update()
 
+    def test_colorsquare_get(self):
+        cs = tkc.ColorSquare(self.window, hue=37, height=100, width=120)
+        cs.pack()
+        self.window.update()
+        for x, y in [(0, 0), (13, 77), (119, 99), (120, 100), (60, 3)]:
+            cs._on_click(TestEvent(x=x, y=y))
+            xp = min(x, cs.bg.width() - 1)
+            yp = min(y, cs.bg.height() - 1)
+            rgb = tuple(int(c) for c in cs.bg.get(xp, yp))
+            self.assertEqual(cs.get()[0], rgb)
+
+    def test_colorsquare_cache(self):
+        cs = tkc.ColorSquare(self.window, hue=60, height=200, width=200)
+        cs.pack()
+        self.window.update()
+        bg = cs.bg
+        cs.set_hue(40)
+        self.assertIsNot(cs.bg, bg)
+        cs.set_hue(60)
+        self.assertIs(cs.bg, bg)
+        self.assertEqual(cs.cache_info()["hits"], 1)
+        cs = tkc.ColorSquare(self.window, hue=60, height=200, width=200,
+                             cache_size=0)
+        cs.pack()
+        self.window.update()
+        cs.set_hue(40)
+        cs.set_hue(60)
+        self.assertEqual(cs.cache_info()["count"], 0)
+
+    def test_colorsquare_prewarm(self):
+        cs = tkc.ColorSquare(self.window, hue=60, height=20, width=20,
+                             prewarm=True, cache_size=10 * 4 * 20 * 20)
+        cs.pack()
+        self.window.update()
+        done, total = cs.prewarm_progress()
+        self.assertEqual(total, 9)
+        while done < total:
+            self.window.after(10)
+            self.window.update()
+            done, total = cs.prewarm_progress()
+        self.assertEqual(cs.cache_info()["count"], 10)
+        misses = cs.cache_info()["misses"]
+        cs.set_hue(64)
+        self.assertEqual(cs.cache_info()["misses"], misses)
+        cs.prewarm()
+        cs.destroy()
+        self.assertEqual(cs.prewarm_progress(), (0, 0))
+
 
 class TestAlphaBar(BaseWidgetTest):
     def test_alphabar_init(self):
@@ -242,8 +684,16 @@ class TestAlphaBar(BaseWidgetTest):
         ab.set(40)
         self.window.update()
         self.assertEqual(ab.get(), 40)
+        gradient = ab.gradient
         ab.set_color((0, 0, 0))
         self.window.update()
+        self.assertIs(ab.gradient, gradient)
+        self.assertEqual(ab.itemcget('cursor', 'fill'), 'gray80')
+        for i in range(5):
+            ab.set_color((0, 0, 10 * i))
+            ab._draw_gradient(10, (0, 0, 0))
+        self.assertEqual(ab.check_items(), 2)
+        self.assertIs(ab.gradient, gradient)
         ab.set_color((0, 0, 0, 100))
         self.window.update()
         ab._update_alpha()
@@ -255,6 +705,22 @@ class TestAlphaBar(BaseWidgetTest):
         self.window.update()
         self.assertEqual(ab.get(), 0)
 
+    def test_alphabar_notifications(self):
+        ab = tkc.AlphaBar(self.window, alpha=20, height=12, width=200)
+        ab.pack()
+        self.window.update()
+        values = []
+        ab.subscribe(values.append)
+        # a callback changing the value is notified at the next idle cycle
+        ab.subscribe(lambda alpha: alpha < 100 and ab.set(100))
+        ab.set(40)
+        ab._on_move(TestEvent(x=ab.winfo_width() // 2, y=1))
+        self.window.update()
+        self.window.update()
+        self.assertEqual(values, [tkf.round2(255 * (ab.winfo_width() // 2) /
+                                                ab.winfo_width()), 100])
+        self.assertEqual(ab.get(), 100)
+
 
 class TestGradientBar(BaseWidgetTest):
     def test_gradientbar_init(self):
@@ -310,6 +776,8 @@ class TestGradientBar(BaseWidgetTest):
         gb.set(40)
         self.window.update()
         self.assertEqual(gb.get(), 40)
+        gb._draw_gradient(60)
+        self.assertEqual(gb.check_items(), 2)
         gb._update_hue()
         self.window.update()
         gb._variable.set(455)
@@ -319,6 +787,94 @@ class TestGradientBar(BaseWidgetTest):
         self.window.update()
         self.assertEqual(gb.get(), 0)
 
+    def test_gradientbar_notifications(self):
+        var = tk.IntVar(self.window)
+        gb = tkc.GradientBar(self.window, hue=20, height=12, width=200,
+                             variable=var)
+        gb.pack()
+        self.window.update()
+        events = []
+        values = []
+        gb.bind("<<HueChanged>>", lambda e: events.append(gb.get()))
+        funcid = gb.subscribe(values.append)
+        gb.set(40)
+        gb.set(50)
+        var.set(60)
+        self.assertEqual(gb.get(), 60)
+        self.assertEqual(events, [])
+        self.window.update()
+        self.assertEqual(events, [60])
+        self.assertEqual(values, [60])
+        gb.unsubscribe(funcid)
+        gb.set(10)
+        self.window.update()
+        self.assertEqual(events, [60, 10])
+        self.assertEqual(values, [60])
+        self.assertEqual(var.get(), 10)
+
+    def test_gradientbar_shared_gradient(self):
+        gb1 = tkc.GradientBar(self.window, hue=20, height=12, width=200,
+                              highlightthickness=0)
+        gb1.pack()
+        gb2 = tkc.GradientBar(self.window, hue=60, height=12, width=200,
+                              highlightthickness=0)
+        gb2.pack()
+        self.window.update()
+        self.assertIs(gb1.gradient, gb2.gradient)
+        self.assertEqual((gb1.gradient.width(), gb1.gradient.height()), (200, 12))
+        self.assertEqual(tuple(int(c) for c in gb1.gradient.get(100, 11)),
+                         tkf.hue2col(180))
+
+
+class TestPalette(BaseWidgetTest):
+    def test_palette_init(self):
+        pal = Palette(self.window)
+        pal.pack()
+        self.window.update()
+        self.assertEqual(pal.check_items(), 2)
+        self.assertEqual(pal.rows, 2)
+        self.assertIsNone(pal.get())
+        self.assertEqual(pal.image.get(4 * 20 + 5, 20 + 5), (255, 255, 255))
+        self.assertEqual(pal.yview(), (0., 1.))
+
+    def test_palette_bindings(self):
+        colors = [(i, 255 - i, 0) for i in range(256)]
+        yview = []
+        pal = Palette(self.window, colors, columns=16, visible_rows=4,
+                      yscrollcommand=lambda *args: yview.append(args))
+        pal.pack()
+        self.window.update()
+        self.assertEqual(yview[-1], (0., 0.25))
+        self.assertEqual(pal.index_at(20 + 2, 3 * 20 + 2), 49)
+        self.assertIsNone(pal.index_at(20 + 1, 3 * 20 + 2))
+        self.assertIsNone(pal.index_at(20 * 16 + 5, 5))
+        pal._on_click(TestEvent(x=20 + 2, y=3 * 20 + 2))
+        self.assertEqual(pal.get(), (49, 206, 0))
+        self.assertEqual(pal.get_index(), 49)
+        # keyboard navigation scrolls the palette
+        pal._move_focus(16)
+        self.assertEqual(pal.yview(), (1 / 16., 5 / 16.))
+        pal._on_key_select(None)
+        self.assertEqual(pal.get(), (65, 190, 0))
+        pal._move_focus(1000)
+        pal._on_key_select(None)
+        self.assertEqual(pal.get(), (255, 0, 0))
+        self.assertEqual(pal.yview(), (0.75, 1.))
+        self.assertEqual(yview[-1], (0.75, 1.))
+        self.assertEqual(pal.index_at(15 * 20 + 2, 3 * 20 + 2), 255)
+        pal.yview("moveto", 0.5)
+        self.assertEqual(pal.yview(), (0.5, 0.75))
+        pal.yview("scroll", -1, "pages")
+        self.assertEqual(pal.yview(), (0.25, 0.5))
+        pal._on_mousewheel(TestEvent(delta=120))
+        self.assertEqual(pal.yview(), (3 / 16., 7 / 16.))
+        self.assertEqual(pal.image.get(2, 2), (128, 128, 128))
+        self.assertEqual(pal.image.get(5, 5), (48, 207, 0))
+        pal.set_colors(['red', '#00FF00'])
+        self.assertEqual(pal.rows, 1)
+        self.assertIsNone(pal.get())
+        self.assertEqual(pal.check_items(), 2)
+
 
 class TestColorPicker(BaseWidgetTest):
     def test_colorpicker_init(self):
@@ -438,14 +994,38 @@ class TestColorPicker(BaseWidgetTest):
         self.assertEqual(cp.square.get(), ((255, 255, 255), (0, 0, 100), '#FFFFFF'))
         self.assertEqual(cp.alpha.get(), 255)
         self.window.update()
-        event = TestEvent(widget=tk.Label(self.window, bg='white'))
+        # click on 'white' (PALETTE[13]: second row, fifth column)
+        cp.palette._on_click(TestEvent(x=4 * 20 + 5, y=20 + 5))
+        self.window.update()
+        self.assertEqual(cp.square.get(), ((255, 255, 255), (0, 0, 100), '#FFFFFF'))
+        cp.palette._on_click(TestEvent(x=0, y=0))
         cp._palette_cmd(event)
         self.window.update()
         self.assertEqual(cp.square.get(), ((255, 255, 255), (0, 0, 100), '#FFFFFF'))
+        event = TestEvent(widget=tk.Label(self.window, bg='white'))
         cp._reset_preview(event)
         self.window.update()
         self.assertEqual(cp.square.get(), ((0, 255, 0), (120, 100, 100), '#00FF00'))
 
+        # coalesced motion updates
+        cp._last_refresh = 0
+        cp.square._on_move(TestEvent(x=0, y=0))
+        cp._schedule_sel_color(event)
+        sel_color_id = cp._sel_color_id
+        self.assertIsNotNone(sel_color_id)
+        cp.square._on_move(TestEvent(x=cp.square.winfo_width(), y=0))
+        cp._schedule_sel_color(event)
+        self.assertEqual(cp._sel_color_id, sel_color_id)
+        self.window.update()
+        self.assertIsNone(cp._sel_color_id)
+        self.assertEqual(cp.hexa.get(), '#00FF00FF')
+        cp.square._on_move(TestEvent(x=0, y=0))
+        cp._schedule_sel_color(event)
+        self.assertIsNotNone(cp._sel_color_id)
+        cp._on_square_release(event)
+        self.assertIsNone(cp._sel_color_id)
+        self.assertEqual(cp.hexa.get(), '#000000FF')
+
         cp.hexa.focus_set()
         self.window.update()
         self.assertFalse(cp.hexa.selection_present())
@@ -504,6 +1084,15 @@ class TestColorPicker(BaseWidgetTest):
         self.assertEqual(cp.square.get(), ((255, 255, 0), (60, 100, 100), '#FFFF00'))
         self.assertEqual(cp.alpha.get(), 255)
         # ALPHA
+        im_color = cp._im_color
+        preview = cp._preview
+        for a in (10, 100, 200):
+            cp.set_color((20, 130, 240, a))
+            self.assertEqual(cp._preview.tobytes(),
+                             tkf.overlay(cp._transparent_bg, (20, 130, 240, a)).tobytes())
+        self.assertIs(cp._im_color, im_color)
+        self.assertIs(cp._preview, preview)
+        cp.set_color((255, 255, 0, 255))
         cp.alpha.set(0)
         self.window.update()
         cp._update_alpha()
@@ -555,6 +1144,73 @@ class TestColorPicker(BaseWidgetTest):
                          ((255, 0, 0), (0, 100, 100), "#FF0000"))
         self.window.update()
 
+    def test_colorpicker_set_color(self):
+        cp = tkc.ColorPicker(self.window, color=(255, 0, 0, 100), title='Test',
+                             alpha=True)
+        self.window.update()
+        cp.set_color("#FFFF00")
+        self.assertEqual(cp.hexa.get(), '#FFFF0064')
+        self.assertEqual(cp.square.get(), ((255, 255, 0), (60, 100, 100), '#FFFF00'))
+        self.assertEqual((cp.green.get(), cp.hue.get()), (255, 60))
+        # only the changed widgets are updated
+        updates = cp.widget_updates
+        cp.set_color((255, 255, 0, 10))
+        self.assertEqual(cp.widget_updates - updates, 4)
+        self.assertEqual(cp.alpha.get(), 10)
+        updates = cp.widget_updates
+        cp.set_color((255, 255, 0, 10))
+        self.assertEqual(cp.widget_updates, updates)
+        cp.ok()
+        self.assertEqual(cp.get_color(),
+                         ((255, 255, 0, 10), (60, 100, 100), '#FFFF000A'))
+
+    def test_colorpicker_color_names(self):
+        cp = tkc.ColorPicker(self.window, color="saddle brown", color_names=True)
+        self.window.update()
+        self.assertEqual(cp.color_name.cget('text'), 'saddlebrown')
+        cp.set_color((250, 3, 2))
+        self.assertEqual(cp.color_name.cget('text'), 'red')
+        cp.destroy()
+
+    def test_colorpicker_subscribe(self):
+        cp = tkc.ColorPicker(self.window, color=(255, 0, 0), alpha=True)
+        self.window.update()
+        states = []
+        funcid = cp.subscribe(states.append)
+        cp.set_color((0, 0, 255))
+        cp.set_color((0, 255, 0, 20))
+        self.window.update()
+        self.assertEqual(states, [tkf.ColorState((0, 255, 0), alpha=20)])
+        cp.unsubscribe(funcid)
+        cp.set_color('white')
+        self.window.update()
+        self.assertEqual(len(states), 1)
+        cp.destroy()
+
+    def test_colorpicker_history(self):
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'history')
+        try:
+            cp = tkc.ColorPicker(self.window, color=(0, 255, 0), history=path)
+            self.window.update()
+            self.assertEqual(cp.history.colors, [])
+            cp.ok()
+            cp = tkc.ColorPicker(self.window, color=(255, 0, 0, 10), alpha=True,
+                                 history=path)
+            self.window.update()
+            cp.ok()
+            cp = tkc.ColorPicker(self.window, color=(0, 0, 255), alpha=True,
+                                 history=path)
+            self.window.update()
+            self.assertEqual(cp.history.colors, [(255, 0, 0, 10), (0, 255, 0, 255)])
+            cp.history._on_click(TestEvent(x=20 + 5, y=5))
+            self.assertEqual(cp.get_color(), '')
+            cp.ok()
+            self.assertEqual(cp.get_color(),
+                             ((0, 255, 0, 255), (120, 100, 100), '#00FF00FF'))
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_askcolor(self):
 
         def test(event):
@@ -572,3 +1228,56 @@ class TestColorPicker(BaseWidgetTest):
 
         self.window.after(100, events)
         tkc.askcolor(parent=self.window)
+
+    def test_askcolor_pool(self):
+        pool = tkc.DialogPool(maxsize=1, idle_timeout=None)
+        dialogs = []
+
+        def events(color_action):
+            self.window.update()
+            c = [w for w in self.window.children.values()
+                 if isinstance(w, tkc.ColorPicker)][0]
+            dialogs.append(c)
+            getattr(c, color_action)()
+
+        self.window.after(100, events, 'ok')
+        self.assertEqual(tkc.askcolor('red', parent=self.window, pool=pool),
+                         ((255, 0, 0), '#FF0000'))
+        self.assertEqual(len(pool), 1)
+        self.assertTrue(dialogs[0].winfo_exists())
+        self.assertEqual(dialogs[0].state(), 'withdrawn')
+        # the withdrawn dialog is reused and reset
+        self.window.after(100, events, 'ok')
+        self.assertEqual(tkc.askcolor('#0000FF', parent=self.window, pool=pool),
+                         ((0, 0, 255), '#0000FF'))
+        self.assertIs(dialogs[0], dialogs[1])
+        self.assertEqual(dialogs[1]._old_color, (0, 0, 255))
+        self.window.after(100, events, 'cancel')
+        self.assertEqual(tkc.askcolor('blue', parent=self.window, pool=pool),
+                         (None, None))
+        self.assertIs(dialogs[0], dialogs[2])
+        # a dialog with alpha support does not share the pool entry and
+        # the least recently used dialog is evicted
+        self.window.after(100, events, 'ok')
+        self.assertEqual(tkc.askcolor('blue', parent=self.window, alpha=True,
+                                      pool=pool),
+                         ((0, 0, 255, 255), '#0000FFFF'))
+        self.assertIsNot(dialogs[3], dialogs[0])
+        self.assertFalse(dialogs[0].winfo_exists())
+        self.assertEqual(len(pool), 1)
+        pool.clear()
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(dialogs[3].winfo_exists())
+        self.window.after(100, events, 'ok')
+        self.assertIs(tkc.askcolor('#0000FF', parent=self.window, pool=pool,
+                                   as_color=True),
+                      tkc.Color(0, 0, 255))
+        self.window.after(100, events, 'cancel')
+        self.assertIsNone(tkc.askcolor('#0000FF', parent=self.window, pool=pool,
+                                       as_color=True))
+        # a dialog that cannot be reset is destroyed
+        self.assertEqual(len(pool), 1)
+        self.assertRaises((ValueError, tk.TclError), pool.acquire, self.window,
+                          'notacolor')
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(dialogs[-1].winfo_exists())
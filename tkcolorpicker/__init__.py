@@ -18,7 +18,45 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
-from tkcolorpicker.colorpicker import ColorPicker, askcolor
-from tkcolorpicker.alphabar import AlphaBar
-from tkcolorpicker.gradientbar import GradientBar
-from tkcolorpicker.colorsquare import ColorSquare
+import sys
+
+__all__ = ["ColorPicker", "DialogPool", "askcolor", "AlphaBar", "GradientBar",
+           "ColorSquare", "parse_color", "Palette", "ColorHistory", "Color"]
+
+# submodule defining each public name, the submodules are imported on first
+# access so that tkcolorpicker.core can be used without importing tkinter
+_SUBMODULES = {"ColorPicker": "colorpicker", "DialogPool": "colorpicker",
+               "askcolor": "colorpicker", "AlphaBar": "alphabar",
+               "GradientBar": "gradientbar", "ColorSquare": "colorsquare",
+               "parse_color": "colorspec", "Palette": "palette",
+               "ColorHistory": "history", "Color": "core"}
+
+if sys.version_info < (3, 7):
+    # module __getattr__ is not supported: the names are imported eagerly
+    from tkcolorpicker.colorspec import parse_color
+    from tkcolorpicker.history import ColorHistory
+    from tkcolorpicker.core import Color
+    try:
+        from tkcolorpicker.colorpicker import ColorPicker, DialogPool, askcolor
+        from tkcolorpicker.gradientbar import GradientBar
+        from tkcolorpicker.colorsquare import ColorSquare
+        from tkcolorpicker.palette import Palette
+        from tkcolorpicker.alphabar import AlphaBar
+    except ImportError:
+        # tkinter or Pillow is missing, only the tkinter-free modules
+        # (core, colorspec and history) can be used
+        pass
+else:
+    from importlib import import_module
+
+    def __getattr__(name):
+        try:
+            submodule = _SUBMODULES[name]
+        except KeyError:
+            raise AttributeError("module %r has no attribute %r" % (__name__, name))
+        value = getattr(import_module("tkcolorpicker." + submodule), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_SUBMODULES))
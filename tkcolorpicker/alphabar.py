@@ -21,12 +21,21 @@ Alpha channel gradient bar
 
 
 from PIL import Image, ImageTk
-from tkcolorpicker.functions import tk, round2, rgb_to_hsv
-from tkcolorpicker.functions import create_checkered_image
+from tkcolorpicker.functions import tk
+from tkcolorpicker.core import round2, rgb_to_hsv, get_checkered_image
+from tkcolorpicker.notifier import Notifier
 
 
-class AlphaBar(tk.Canvas):
-    """Bar to select alpha value."""
+class AlphaBar(tk.Canvas, Notifier):
+    """
+    Bar to select alpha value.
+
+    The <<AlphaChanged>> event is generated once per main loop iteration in
+    which the alpha value changed, callbacks receiving the new value can
+    also be registered with subscribe.
+    """
+
+    _notify_sequence = "<<AlphaChanged>>"
 
     def __init__(self, parent, alpha=255, color=(255, 0, 0), height=11,
                  width=256, variable=None, **kwargs):
@@ -41,7 +50,15 @@ class AlphaBar(tk.Canvas):
             * height, width, and any keyword argument accepted by a tkinter Canvas
         """
         tk.Canvas.__init__(self, parent, width=width, height=height, **kwargs)
-        self.gradient = tk.PhotoImage(master=self, width=width, height=height)
+        self.gradient = None
+        # size of the gradient, checkered background and alpha mask
+        self._size = None
+        self._checkered = None
+        self._mask = None
+        self._color = tuple(color[:3])
+        # the canvas items are created once and updated in place
+        self.create_image(0, 0, anchor="nw", tags="gradient")
+        self.create_line(0, 0, 0, 0, width=2, tags='cursor')
 
         self._variable = variable
         if variable is not None:
@@ -55,83 +72,126 @@ class AlphaBar(tk.Canvas):
             alpha = 255
         elif alpha < 0:
             alpha = 0
+        self._alpha = alpha
+        # True while the bar writes in the variable to ignore its own trace
+        self._writing = False
         self._variable.set(alpha)
+        self._init_notifier()
         try:
             self._variable.trace_add("write", self._update_alpha)
         except Exception:
             self._variable.trace("w", self._update_alpha)
 
-        self.bind('<Configure>', lambda e: self._draw_gradient(alpha, color))
+        self.bind('<Configure>', lambda e: self._draw_gradient(self._alpha, self._color))
         self.bind('<ButtonPress-1>', self._on_click)
         self.bind('<B1-Motion>', self._on_move)
 
+    @staticmethod
+    def _create_mask(width, height):
+        """Return the alpha gradient mask of size width x height."""
+        w = max(width - 1., 1.)
+        mask = Image.new("L", (width, 1))
+        mask.putdata([round2(i / w * 255) for i in range(width)])
+        return mask.resize((width, height), Image.NEAREST)
+
+    @staticmethod
+    def _get_cursor_fill(color):
+        """Return the cursor color suited to the gradient color."""
+        h, s, v = rgb_to_hsv(*color)
+        if v < 50:
+            return "gray80"
+        else:
+            return 'black'
+
+    def _recolor(self, color):
+        """Redraw the gradient in color (RGB) in the existing image."""
+        gradient = Image.new("RGBA", self._size, color)
+        gradient.putalpha(self._mask)
+        self.gradient.paste(Image.alpha_composite(self._checkered, gradient))
+
     def _draw_gradient(self, alpha, color):
         """Draw the gradient and put the cursor on alpha."""
-        self.delete("gradient")
-        self.delete("cursor")
-        del self.gradient
         width = self.winfo_width()
         height = self.winfo_height()
 
-        bg = create_checkered_image(width, height)
-        r, g, b = color
-        w = width - 1.
-        gradient = Image.new("RGBA", (width, height))
-        for i in range(width):
-            for j in range(height):
-                gradient.putpixel((i, j), (r, g, b, round2(i / w * 255)))
-        self.gradient = ImageTk.PhotoImage(Image.alpha_composite(bg, gradient),
-                                           master=self)
-
-        self.create_image(0, 0, anchor="nw", tags="gardient",
-                          image=self.gradient)
-        self.lower("gradient")
+        if self._size != (width, height):
+            self._size = (width, height)
+            self._checkered = get_checkered_image(width, height)
+            self._mask = self._create_mask(width, height)
+            self.gradient = ImageTk.PhotoImage("RGBA", self._size, master=self)
+            self.itemconfigure("gradient", image=self.gradient)
+        self._color = tuple(color)
+        self._recolor(self._color)
 
+        self._alpha = alpha
         x = alpha / 255. * width
-        h, s, v = rgb_to_hsv(r, g, b)
-        if v < 50:
-            fill = "gray80"
-        else:
-            fill = 'black'
-        self.create_line(x, 0, x, height, width=2, tags='cursor', fill=fill)
+        self.coords('cursor', x, 0, x, height)
+        self.itemconfigure('cursor', fill=self._get_cursor_fill(self._color))
+
+    def check_items(self):
+        """
+        Return the number of canvas items (debugging helper).
+
+        Raise an AssertionError if the canvas does not contain exactly the
+        gradient image and the cursor.
+        """
+        nb = len(self.find_all())
+        assert nb == 2, "AlphaBar contains %i canvas items instead of 2" % nb
+        return nb
 
     def _on_click(self, event):
         """Move selection cursor on click."""
-        x = event.x
-        self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(round2((255. * x) / self.winfo_width()))
+        self.set(round2((255. * event.x) / self.winfo_width()))
 
     def _on_move(self, event):
         """Make selection cursor follow the cursor."""
         w = self.winfo_width()
         x = min(max(event.x, 0), w)
-        self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(round2((255. * x) / w))
+        self.set(round2((255. * x) / w))
 
     def _update_alpha(self, *args):
-        alpha = int(self._variable.get())
+        """Follow the changes of the variable made outside of the bar."""
+        if self._writing:
+            return
+        try:
+            alpha = int(self._variable.get())
+        except (ValueError, tk.TclError):
+            return
         if alpha > 255:
             alpha = 255
         elif alpha < 0:
             alpha = 0
         self.set(alpha)
-        self.event_generate("<<AlphaChanged>>")
+
+    def _get_notify_value(self):
+        return self._alpha
 
     def get(self):
         """Return hue of color under cursor."""
-        coords = self.coords('cursor')
-        return round2((255. * coords[0]) / self.winfo_width())
+        return self._alpha
 
     def set(self, alpha):
         """Set cursor position on the color corresponding to the hue value."""
+        self._alpha = alpha
         x = alpha / 255. * self.winfo_width()
         self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(alpha)
+        self._writing = True
+        try:
+            self._variable.set(alpha)
+        finally:
+            self._writing = False
+        self._notify()
 
     def set_color(self, color):
         """Set gradient color to color in RGB(A)."""
-        if len(color) == 3:
-            alpha = self.get()
-        else:
-            alpha = color[3]
-        self._draw_gradient(alpha, color[:3])
+        self._color = tuple(color[:3])
+        if self._size is None:
+            # the gradient will be drawn on <Configure>
+            return
+        self._recolor(self._color)
+        self.itemconfigure('cursor', fill=self._get_cursor_fill(self._color))
+        if len(color) > 3:
+            width, height = self._size
+            self._alpha = color[3]
+            x = color[3] / 255. * width
+            self.coords('cursor', x, 0, x, height)
@@ -20,16 +20,20 @@ Colorpicker dialog
 """
 
 
-from PIL import ImageTk
-from tkcolorpicker.functions import tk, ttk, round2, create_checkered_image, \
-    overlay, PALETTE, hsv_to_rgb, hexa_to_rgb, rgb_to_hexa, col2hue, rgb_to_hsv
-from tkcolorpicker.alphabar import AlphaBar
+from tkcolorpicker.functions import tk, ttk
+from tkcolorpicker.core import round2, get_checkered_image, overlay, PALETTE, \
+    hexa_to_rgb, col2hue, rgb_to_hsv, ColorState, Color, ColorNameIndex, \
+    string_types
 from tkcolorpicker.gradientbar import GradientBar
 from tkcolorpicker.colorsquare import ColorSquare
 from tkcolorpicker.spinbox import Spinbox
 from tkcolorpicker.limitvar import LimitVar
-from locale import getdefaultlocale
-import re
+from tkcolorpicker.colorspec import parse_color
+from tkcolorpicker.palette import Palette
+from tkcolorpicker.history import ColorHistory, HISTORY_SIZE
+from tkcolorpicker.notifier import Notifier
+from time import time
+from collections import OrderedDict
 
 
 # --- Translation
@@ -37,27 +41,63 @@ EN = {}
 FR = {"Red": "Rouge", "Green": "Vert", "Blue": "Bleu",
       "Hue": "Teinte", "Saturation": "Saturation", "Value": "Valeur",
       "Cancel": "Annuler", "Color Chooser": "Sélecteur de couleur",
-      "Alpha": "Alpha"}
+      "Alpha": "Alpha", "Recent colors": "Couleurs récentes"}
 
-try:
-    if getdefaultlocale()[0][:2] == 'fr':
-        TR = FR
-    else:
-        TR = EN
-except ValueError:
-    TR = EN
+# translation dictionary, selected from the locale on first use
+TR = None
 
 
 def _(text):
     """Translate text."""
+    global TR
+    if TR is None:
+        from locale import getdefaultlocale
+        try:
+            if getdefaultlocale()[0][:2] == 'fr':
+                TR = FR
+            else:
+                TR = EN
+        except (ValueError, TypeError):
+            TR = EN
     return TR.get(text, text)
 
 
-class ColorPicker(tk.Toplevel):
-    """Color picker dialog."""
+# maximum number of display updates per second while dragging the
+# selection cross in the color square
+REFRESH_RATE = 60
+
+_default_color_names = None
+
+
+def get_default_color_names():
+    """Return the ColorNameIndex of the X11/Tk color names (created once)."""
+    global _default_color_names
+    if _default_color_names is None:
+        _default_color_names = ColorNameIndex()
+    return _default_color_names
+
+
+_HEXDIGITS = frozenset("0123456789ABCDEF")
+
+
+def _is_hexa(color, nb_digits):
+    """Return True if color is in #RRGGBB(AA) format with nb_digits digits."""
+    return (len(color) == nb_digits + 1 and color[0] == "#" and
+            _HEXDIGITS.issuperset(color[1:]))
+
+
+class ColorPicker(tk.Toplevel, Notifier):
+    """
+    Color picker dialog.
+
+    Callbacks receiving the selected color as a ColorState each time it
+    changes can be registered with subscribe.
+    """
 
     def __init__(self, parent=None, color=(255, 0, 0), alpha=False,
-                 title=_("Color Chooser")):
+                 title=None, prewarm=False,
+                 refresh_rate=REFRESH_RATE, color_names=None, palette=PALETTE,
+                 history=None, history_size=HISTORY_SIZE):
         """
         Create a ColorPicker dialog.
 
@@ -65,10 +105,27 @@ class ColorPicker(tk.Toplevel):
             * parent: parent window
             * color: initially selected color in rgb or hexa format
             * alpha: alpha channel support (boolean)
-            * title: dialog title
+            * title: dialog title (translation of "Color Chooser" by default)
+            * prewarm: render the color square gradients of the hues closest
+                       to the initial one (within the cache budget of the
+                       ColorSquare) in a background thread when the dialog
+                       opens (boolean)
+            * refresh_rate: maximum number of display updates per second
+                            while dragging the selection cross
+            * color_names: display the name of the closest named color next
+                           to the HTML entry, either True to use the X11/Tk
+                           color names or a ColorNameIndex
+            * palette: list of the palette colors (RGB tuples, hexadecimal
+                       notation or color names)
+            * history: display the recently selected colors, stored in the
+                       file history (True for the default location), and
+                       add the selected color to them
+            * history_size: number of colors in the history
         """
         tk.Toplevel.__init__(self, parent)
 
+        if title is None:
+            title = _("Color Chooser")
         self.title(title)
         self.transient(self.master)
         self.resizable(False, False)
@@ -76,43 +133,37 @@ class ColorPicker(tk.Toplevel):
 
         self.color = ""
         self.alpha_channel = bool(alpha)
+        # motion updates of the color square are coalesced and displayed
+        # at most refresh_rate times per second
+        self._refresh_delay = 1000. / refresh_rate
+        self._last_refresh = 0
+        self._sel_color_id = None
+        if color_names is True:
+            color_names = get_default_color_names()
+        self._color_names = color_names
+        if history:
+            self._history = ColorHistory(None if history is True else history,
+                                         history_size)
+        else:
+            self._history = None
+        # pool the dialog belongs to (see DialogPool), None if the dialog
+        # is destroyed when closed
+        self._pool = None
+        # set to False when the dialog is closed
+        self._opened = tk.BooleanVar(self, True)
+        self._init_notifier()
         style = ttk.Style(self)
-        style.map("palette.TFrame", relief=[('focus', 'sunken')],
-                  bordercolor=[('focus', "#4D4D4D")])
         self.configure(background=style.lookup("TFrame", "background"))
 
-        if isinstance(color, str):
-            if re.match(r"^#[0-9A-F]{8}$", color.upper()):
-                col = hexa_to_rgb(color)
-                self._old_color = col[:3]
-                if alpha:
-                    self._old_alpha = col[3]
-                    old_color = color
-                else:
-                    old_color = color[:7]
-            elif re.match(r"^#[0-9A-F]{6}$", color.upper()):
-                self._old_color = hexa_to_rgb(color)
-                old_color = color
-                if alpha:
-                    self._old_alpha = 255
-                    old_color += 'FF'
-            else:
-                col = self.winfo_rgb(color)
-                self._old_color = tuple(round2(c * 255 / 65535) for c in col)
-                args = self._old_color
-                if alpha:
-                    self._old_alpha = 255
-                    args = self._old_color + (255,)
-                old_color = rgb_to_hexa(*args)
+        self._old_color, old_alpha = self._parse_color(color)
+        if alpha:
+            self._old_alpha = 255 if old_alpha is None else old_alpha
         else:
-            self._old_color = color[:3]
-            if alpha:
-                if len(color) < 4:
-                    color += (255,)
-                    self._old_alpha = 255
-                else:
-                    self._old_alpha = color[3]
-            old_color = rgb_to_hexa(*color)
+            self._old_alpha = None
+        self._state = ColorState(self._old_color, alpha=self._old_alpha)
+        # number of widget updates done to display color changes
+        self.widget_updates = 0
+        old_color = self._state.hexa
 
         # --- GradientBar
         hue = col2hue(*self._old_color)
@@ -124,7 +175,7 @@ class ColorPicker(tk.Toplevel):
         square = ttk.Frame(self, borderwidth=2, relief='groove')
         self.square = ColorSquare(square, hue=hue, width=200, height=200,
                                   color=rgb_to_hsv(*self._old_color),
-                                  highlightthickness=0)
+                                  highlightthickness=0, prewarm=prewarm)
         self.square.pack()
 
         frame = ttk.Frame(self)
@@ -135,42 +186,68 @@ class ColorPicker(tk.Toplevel):
         preview_frame = ttk.Frame(frame, relief="groove", borderwidth=2)
         preview_frame.grid(row=0, column=0, sticky="nw", pady=2)
         if alpha:
-            self._transparent_bg = create_checkered_image(42, 32)
-            transparent_bg_old = create_checkered_image(42, 32,
-                                                        (100, 100, 100, 255),
-                                                        (154, 154, 154, 255))
-            prev_old = overlay(transparent_bg_old, hexa_to_rgb(old_color))
-            prev = overlay(self._transparent_bg, hexa_to_rgb(old_color))
+            # PIL is only needed to display transparency
+            from PIL import Image, ImageTk
+            self._transparent_bg = get_checkered_image(42, 32)
+            self._transparent_bg_old = get_checkered_image(42, 32,
+                                                           (100, 100, 100, 255),
+                                                           (154, 154, 154, 255))
+            prev_old = overlay(self._transparent_bg_old, hexa_to_rgb(old_color))
             self._im_old_color = ImageTk.PhotoImage(prev_old, master=self)
-            self._im_color = ImageTk.PhotoImage(prev, master=self)
-            old_color_prev = tk.Label(preview_frame, padx=0, pady=0,
-                                      image=self._im_old_color,
-                                      borderwidth=0, highlightthickness=0)
+            # persistent buffers for the preview of the selected color:
+            # the preview only contains the two colors of the checkered
+            # background blended with the selected color, so it is updated
+            # by blending these two colors and filling the preview
+            self._preview = self._transparent_bg.copy()
+            self._preview_mask = get_checkered_image(42, 32, (0, 0, 0, 0),
+                                                     (255, 255, 255, 255)).convert("L")
+            self._preview_swatch = Image.new("RGBA", (2, 1))
+            self._preview_swatch.putdata([(154, 154, 154, 255), (100, 100, 100, 255)])
+            self._preview_overlay = Image.new("RGBA", (2, 1))
+            self._im_color = ImageTk.PhotoImage("RGBA", (42, 32), master=self)
+            self._draw_preview(hexa_to_rgb(old_color))
+            self._old_color_prev = tk.Label(preview_frame, padx=0, pady=0,
+                                            image=self._im_old_color,
+                                            borderwidth=0, highlightthickness=0)
             self.color_preview = tk.Label(preview_frame, pady=0, padx=0,
                                           image=self._im_color,
                                           borderwidth=0, highlightthickness=0)
         else:
-            old_color_prev = tk.Label(preview_frame, background=old_color[:7],
-                                      width=5, highlightthickness=0, height=2,
-                                      padx=0, pady=0)
+            self._old_color_prev = tk.Label(preview_frame, background=old_color[:7],
+                                            width=5, highlightthickness=0, height=2,
+                                            padx=0, pady=0)
             self.color_preview = tk.Label(preview_frame, width=5, height=2,
                                           pady=0, background=old_color[:7],
                                           padx=0, highlightthickness=0)
-        old_color_prev.bind("<1>", self._reset_preview)
-        old_color_prev.grid(row=0, column=0)
+        self._old_color_prev.bind("<1>", self._reset_preview)
+        self._old_color_prev.grid(row=0, column=0)
         self.color_preview.grid(row=0, column=1)
 
         # --- palette
-        palette = ttk.Frame(frame)
-        palette.grid(row=0, column=1, rowspan=2, sticky="ne")
-        for i, col in enumerate(PALETTE):
-            f = ttk.Frame(palette, borderwidth=1, relief="raised",
-                          style="palette.TFrame")
-            l = tk.Label(f, background=col, width=2, height=1)
-            l.bind("<1>", self._palette_cmd)
-            f.bind("<FocusOut>", lambda e: e.widget.configure(relief="raised"))
-            l.pack()
-            f.grid(row=i % 2, column=i // 2, padx=2, pady=2)
+        palette_frame = ttk.Frame(frame)
+        palette_frame.grid(row=0, column=1, rowspan=2, sticky="ne")
+        rows = (len(palette) + 8) // 9
+        scrollbar = ttk.Scrollbar(palette_frame, orient="vertical",
+                                  command=lambda *args: self.palette.yview(*args))
+        self.palette = Palette(palette_frame, palette, columns=9,
+                               visible_rows=min(max(rows, 2), 4),
+                               yscrollcommand=scrollbar.set)
+        self.palette.pack(side="left")
+        if rows > 4:
+            scrollbar.pack(side="left", fill="y")
+
+        # --- history
+        if self._history is not None:
+            self._history_colors = self._history.load()
+            history_frame = ttk.Frame(frame)
+            history_frame.grid(row=2, column=0, columnspan=2, sticky="w",
+                               pady=(4, 0))
+            ttk.Label(history_frame,
+                      text=_("Recent colors")).pack(side="left", padx=(0, 4))
+            self.history = Palette(history_frame, self._history_colors,
+                                   columns=max(1, min(history_size, 18)),
+                                   visible_rows=1)
+            self.history.pack(side="left")
 
         col_frame = ttk.Frame(self)
         # --- hsv
@@ -241,9 +318,14 @@ class ColorPicker(tk.Toplevel):
         self.hexa.insert(0, old_color.upper())
         ttk.Label(hexa_frame, text="HTML").pack(side="left", padx=4, pady=(4, 1))
         self.hexa.pack(side="left", padx=6, pady=(4, 1), fill='x', expand=True)
+        if color_names is not None:
+            self.color_name = ttk.Label(hexa_frame, width=16, anchor="w",
+                                        text=color_names.nearest(self._state.rgb)[0])
+            self.color_name.pack(side="left", padx=(0, 4), pady=(4, 1))
 
         # --- alpha
         if alpha:
+            from tkcolorpicker.alphabar import AlphaBar
             alpha_frame = ttk.Frame(self)
             alpha_frame.columnconfigure(1, weight=1)
             self.alpha = LimitVar(0, 255, self)
@@ -265,7 +347,7 @@ class ColorPicker(tk.Toplevel):
         ttk.Button(button_frame, text="Ok",
                    command=self.ok).pack(side="right", padx=10)
         ttk.Button(button_frame, text=_("Cancel"),
-                   command=self.destroy).pack(side="right", padx=10)
+                   command=self.cancel).pack(side="right", padx=10)
 
         # --- placement
         bar.grid(row=0, column=0, padx=10, pady=(10, 4), sticky='n')
@@ -284,8 +366,11 @@ class ColorPicker(tk.Toplevel):
             self.alphabar.bind("<ButtonRelease-1>", self._change_alpha, True)
             self.alphabar.bind("<Button-1>", self._unfocus, True)
         self.square.bind("<Button-1>", self._unfocus, True)
-        self.square.bind("<ButtonRelease-1>", self._change_sel_color, True)
-        self.square.bind("<B1-Motion>", self._change_sel_color, True)
+        self.square.bind("<ButtonRelease-1>", self._on_square_release, True)
+        self.square.bind("<B1-Motion>", self._schedule_sel_color, True)
+        self.palette.bind("<<ColorChanged>>", self._palette_cmd)
+        if self._history is not None:
+            self.history.bind("<<ColorChanged>>", self._history_cmd)
         s_red.bind('<FocusOut>', self._update_color_rgb)
         s_green.bind('<FocusOut>', self._update_color_rgb)
         s_blue.bind('<FocusOut>', self._update_color_rgb)
@@ -311,12 +396,69 @@ class ColorPicker(tk.Toplevel):
         self.hexa.bind("<FocusOut>", self._update_color_hexa)
         self.hexa.bind("<Return>", self._update_color_hexa)
         self.hexa.bind("<Control-a>", self._select_all_entry)
+        self.bind("<Destroy>", self._on_destroy, True)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.show()
+
+    def destroy(self):
+        self._cancel_sel_color()
+        tk.Toplevel.destroy(self)
 
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._opened.set(False)
+
+    def show(self):
+        """Display the dialog and grab the focus."""
+        self._opened.set(True)
+        self.deiconify()
         self.hexa.focus_set()
         self.wait_visibility()
         self.lift()
         self.grab_set()
 
+    def reset(self, color, title=None):
+        """
+        Reset the dialog to reuse it.
+
+        Arguments:
+            * color: new initially selected color in rgb or hexa format
+            * title: new dialog title (the title is unchanged if it is None)
+        """
+        if title is not None:
+            self.title(title)
+        self.color = ""
+        self._old_color, old_alpha = self._parse_color(color)
+        if self.alpha_channel:
+            self._old_alpha = 255 if old_alpha is None else old_alpha
+        state = ColorState(self._old_color, alpha=self._old_alpha)
+        if self.alpha_channel:
+            prev_old = overlay(self._transparent_bg_old, state.rgb + (state.alpha,))
+            self._im_old_color.paste(prev_old)
+        else:
+            self._old_color_prev.configure(background=state.hexa)
+        self._set_state(state)
+        if self._history is not None:
+            self._history_colors = self._history.load()
+            self.history.set_colors(self._history_colors)
+
+    def _close(self):
+        """Close the dialog: withdraw it if it belongs to a pool, destroy it otherwise."""
+        self._cancel_sel_color()
+        if self._pool is None:
+            self.destroy()
+        else:
+            self.grab_release()
+            self.withdraw()
+            self._opened.set(False)
+            self._pool.release(self)
+
+    def cancel(self):
+        """Close the dialog without selecting a color."""
+        self.color = ""
+        self._close()
+
     def get_color(self):
         """Return selected color, return an empty string if no color is selected."""
         return self.color
@@ -339,159 +481,197 @@ class ColorPicker(tk.Toplevel):
         if w != self and 'spinbox' not in str(w) and 'entry' not in str(w):
             self.focus_set()
 
+    def _parse_color(self, color):
+        """
+        Return the color (RGB) and alpha value (None if not given) of color.
+
+        color is given in RGB(A), hexadecimal notation or as a tkinter
+        color name.
+        """
+        try:
+            return parse_color(color)
+        except ValueError:
+            if not isinstance(color, string_types):
+                raise
+            # platform specific color name (e.g. SystemButtonFace)
+            col = self.winfo_rgb(color)
+            return tuple(round2(c * 255 / 65535) for c in col), None
+
+    def _set_state(self, state, skip=()):
+        """
+        Display the color state in the dialog.
+
+        Only the fields that differ from the currently displayed state are
+        pushed to the widgets. skip contains the widgets that already
+        display the new state ('rgb', 'hsv', 'hexa', 'alpha', 'bar',
+        'square' and 'alphabar').
+        """
+        old = self._state
+        self._state = state
+        updates = 0
+        if "rgb" not in skip:
+            for var, new, prev in zip((self.red, self.green, self.blue),
+                                      state.rgb, old.rgb):
+                if new != prev:
+                    var.set(new)
+                    updates += 1
+        if "hsv" not in skip:
+            for var, new, prev in zip((self.hue, self.saturation, self.value),
+                                      state.hsv, old.hsv):
+                if new != prev:
+                    var.set(new)
+                    updates += 1
+        if "hexa" not in skip and state.hexa != old.hexa:
+            self.hexa.delete(0, "end")
+            self.hexa.insert(0, state.hexa)
+            updates += 1
+        if "bar" not in skip and state.hsv[0] != old.hsv[0]:
+            self.bar.set(state.hsv[0])
+            updates += 1
+        if "square" not in skip and state.hsv != old.hsv:
+            self.square.set_hsv(state.hsv)
+            updates += 1
+        if self.alpha_channel:
+            if state.alpha != old.alpha:
+                if "alpha" not in skip:
+                    self.alpha.set(state.alpha)
+                    updates += 1
+                if "alphabar" not in skip:
+                    self.alphabar.set(state.alpha)
+                    updates += 1
+            if state.rgb != old.rgb:
+                self.alphabar.set_color(state.rgb)
+                updates += 1
+        if self._color_names is not None and state.rgb != old.rgb:
+            self.color_name.configure(text=self._color_names.nearest(state.rgb)[0])
+            updates += 1
+        if state.hexa != old.hexa:
+            self._update_preview()
+            updates += 1
+        self.widget_updates += updates
+        if state != old:
+            self._notify()
+
+    def _get_notify_value(self):
+        return self._state
+
+    def set_color(self, color):
+        """
+        Set the selected color.
+
+        color is given in RGB(A), hexadecimal notation or as a tkinter
+        color name. The alpha value is kept if color does not specify it.
+        """
+        rgb, alpha = self._parse_color(color)
+        if not self.alpha_channel:
+            alpha = None
+        elif alpha is None:
+            alpha = self._state.alpha
+        self._set_state(ColorState(rgb, alpha=alpha))
+
+    def _draw_preview(self, color):
+        """Draw color (RGBA) over the checkered background of the preview."""
+        from PIL import Image
+        self._preview_overlay.paste(color, (0, 0, 2, 1))
+        blend = Image.alpha_composite(self._preview_swatch, self._preview_overlay)
+        c1 = blend.getpixel((0, 0))
+        c2 = blend.getpixel((1, 0))
+        box = (0, 0) + self._preview.size
+        self._preview.paste(c1, box)
+        self._preview.paste(c2, box, self._preview_mask)
+        self._im_color.paste(self._preview)
+
     def _update_preview(self):
         """Update color preview."""
-        color = self.hexa.get()
         if self.alpha_channel:
-            prev = overlay(self._transparent_bg, hexa_to_rgb(color))
-            self._im_color = ImageTk.PhotoImage(prev, master=self)
-            self.color_preview.configure(image=self._im_color)
+            self._draw_preview(self._state.rgb + (self._state.alpha,))
         else:
-            self.color_preview.configure(background=color)
+            self.color_preview.configure(background=self._state.hexa)
 
     def _reset_preview(self, event):
         """Respond to user click on a palette item."""
         label = event.widget
         label.master.focus_set()
         label.master.configure(relief="sunken")
-        args = self._old_color
-        if self.alpha_channel:
-            args += (self._old_alpha,)
-            self.alpha.set(self._old_alpha)
-            self.alphabar.set_color(args)
-        color = rgb_to_hexa(*args)
-        h, s, v = rgb_to_hsv(*self._old_color)
-        self.red.set(self._old_color[0])
-        self.green.set(self._old_color[1])
-        self.blue.set(self._old_color[2])
-        self.hue.set(h)
-        self.saturation.set(s)
-        self.value.set(v)
-        self.hexa.delete(0, "end")
-        self.hexa.insert(0, color.upper())
-        self.bar.set(h)
-        self.square.set_hsv((h, s, v))
-        self._update_preview()
-
-    def _palette_cmd(self, event):
-        """Respond to user click on a palette item."""
-        label = event.widget
-        label.master.focus_set()
-        label.master.configure(relief="sunken")
-        r, g, b = self.winfo_rgb(label.cget("background"))
-        r = round2(r * 255 / 65535)
-        g = round2(g * 255 / 65535)
-        b = round2(b * 255 / 65535)
-        args = (r, g, b)
-        if self.alpha_channel:
-            a = self.alpha.get()
-            args += (a,)
-            self.alphabar.set_color(args)
-        color = rgb_to_hexa(*args)
-        h, s, v = rgb_to_hsv(r, g, b)
-        self.red.set(r)
-        self.green.set(g)
-        self.blue.set(b)
-        self.hue.set(h)
-        self.saturation.set(s)
-        self.value.set(v)
-        self.hexa.delete(0, "end")
-        self.hexa.insert(0, color.upper())
-        self.bar.set(h)
-        self.square.set_hsv((h, s, v))
-        self._update_preview()
+        self._set_state(ColorState(self._old_color, alpha=self._old_alpha))
+
+    def _palette_cmd(self, event=None):
+        """Respond to the selection of a palette color."""
+        rgb = self.palette.get()
+        if rgb is not None:
+            self._set_state(ColorState(rgb, alpha=self._state.alpha))
+
+    def _history_cmd(self, event=None):
+        """Respond to the selection of a color of the history."""
+        index = self.history.get_index()
+        if index is not None:
+            r, g, b, a = self._history_colors[index]
+            alpha = a if self.alpha_channel else None
+            self._set_state(ColorState((r, g, b), alpha=alpha))
 
     def _change_sel_color(self, event):
         """Respond to motion of the color selection cross."""
-        (r, g, b), (h, s, v), color = self.square.get()
-        self.red.set(r)
-        self.green.set(g)
-        self.blue.set(b)
-        self.saturation.set(s)
-        self.value.set(v)
-        self.hexa.delete(0, "end")
-        self.hexa.insert(0, color.upper())
-        if self.alpha_channel:
-            self.alphabar.set_color((r, g, b))
-            self.hexa.insert('end',
-                             ("%2.2x" % self.alpha.get()).upper())
-        self._update_preview()
+        rgb, hsv, color = self.square.get()
+        self._set_state(ColorState(rgb, hsv, self._state.alpha),
+                        skip=("square",))
+
+    def _schedule_sel_color(self, event):
+        """Schedule the display update after a motion of the selection cross."""
+        if self._sel_color_id is None:
+            delay = self._refresh_delay - 1000 * (time() - self._last_refresh)
+            if delay > 0:
+                self._sel_color_id = self.after(int(delay), self._flush_sel_color)
+            else:
+                self._sel_color_id = self.after_idle(self._flush_sel_color)
+
+    def _cancel_sel_color(self):
+        """Cancel the scheduled display update."""
+        if self._sel_color_id is not None:
+            self.after_cancel(self._sel_color_id)
+            self._sel_color_id = None
+
+    def _flush_sel_color(self, event=None):
+        """Update the display to the current position of the selection cross."""
+        self._sel_color_id = None
+        self._last_refresh = time()
+        self._change_sel_color(event)
+
+    def _on_square_release(self, event):
+        """Display the final color when the selection cross is released."""
+        self._cancel_sel_color()
+        self._flush_sel_color(event)
 
     def _change_color(self, event):
         """Respond to motion of the hsv cursor."""
         h = self.bar.get()
         self.square.set_hue(h)
-        (r, g, b), (h, s, v), sel_color = self.square.get()
-        self.red.set(r)
-        self.green.set(g)
-        self.blue.set(b)
-        self.hue.set(h)
-        self.saturation.set(s)
-        self.value.set(v)
-        self.hexa.delete(0, "end")
-        self.hexa.insert(0, sel_color.upper())
-        if self.alpha_channel:
-            self.alphabar.set_color((r, g, b))
-            self.hexa.insert('end',
-                             ("%2.2x" % self.alpha.get()).upper())
-        self._update_preview()
+        rgb, hsv, sel_color = self.square.get()
+        self._set_state(ColorState(rgb, hsv, self._state.alpha),
+                        skip=("bar", "square"))
 
     def _change_alpha(self, event):
         """Respond to motion of the alpha cursor."""
-        a = self.alphabar.get()
-        self.alpha.set(a)
-        hexa = self.hexa.get()
-        hexa = hexa[:7] + ("%2.2x" % a).upper()
-        self.hexa.delete(0, 'end')
-        self.hexa.insert(0, hexa)
-        self._update_preview()
+        self._set_state(self._state.with_alpha(self.alphabar.get()),
+                        skip=("alphabar",))
 
     def _update_color_hexa(self, event=None):
         """Update display after a change in the HEX entry."""
         color = self.hexa.get().upper()
-        self.hexa.delete(0, 'end')
-        self.hexa.insert(0, color)
-        if re.match(r"^#[0-9A-F]{6}$", color):
-            r, g, b = hexa_to_rgb(color)
-            self.red.set(r)
-            self.green.set(g)
-            self.blue.set(b)
-            h, s, v = rgb_to_hsv(r, g, b)
-            self.hue.set(h)
-            self.saturation.set(s)
-            self.value.set(v)
-            self.bar.set(h)
-            self.square.set_hsv((h, s, v))
-            if self.alpha_channel:
-                a = self.alpha.get()
-                self.hexa.insert('end', ("%2.2x" % a).upper())
-                self.alphabar.set_color((r, g, b, a))
-        elif self.alpha_channel and re.match(r"^#[0-9A-F]{8}$", color):
+        state = self._state
+        if _is_hexa(color, 6):
+            state = ColorState(hexa_to_rgb(color), alpha=state.alpha)
+        elif self.alpha_channel and _is_hexa(color, 8):
             r, g, b, a = hexa_to_rgb(color)
-            self.red.set(r)
-            self.green.set(g)
-            self.blue.set(b)
-            self.alpha.set(a)
-            self.alphabar.set_color((r, g, b, a))
-            h, s, v = rgb_to_hsv(r, g, b)
-            self.hue.set(h)
-            self.saturation.set(s)
-            self.value.set(v)
-            self.bar.set(h)
-            self.square.set_hsv((h, s, v))
-        else:
-            self._update_color_rgb()
-        self._update_preview()
+            state = ColorState((r, g, b), alpha=a)
+        self._set_state(state, skip=("hexa",))
+        if self.hexa.get() != state.hexa:
+            self.hexa.delete(0, 'end')
+            self.hexa.insert(0, state.hexa)
 
     def _update_alpha(self, event=None):
         """Update display after a change in the alpha spinbox."""
-        a = self.alpha.get()
-        hexa = self.hexa.get()
-        hexa = hexa[:7] + ("%2.2x" % a).upper()
-        self.hexa.delete(0, 'end')
-        self.hexa.insert(0, hexa)
-        self.alphabar.set(a)
-        self._update_preview()
+        self._set_state(self._state.with_alpha(self.alpha.get()),
+                        skip=("alpha",))
 
     def _update_color_hsv(self, event=None):
         """Update display after a change in the HSV spinboxes."""
@@ -499,19 +679,8 @@ class ColorPicker(tk.Toplevel):
             h = self.hue.get()
             s = self.saturation.get()
             v = self.value.get()
-            sel_color = hsv_to_rgb(h, s, v)
-            self.red.set(sel_color[0])
-            self.green.set(sel_color[1])
-            self.blue.set(sel_color[2])
-            if self.alpha_channel:
-                sel_color += (self.alpha.get(),)
-                self.alphabar.set_color(sel_color)
-            hexa = rgb_to_hexa(*sel_color)
-            self.hexa.delete(0, "end")
-            self.hexa.insert(0, hexa)
-            self.square.set_hsv((h, s, v))
-            self.bar.set(h)
-            self._update_preview()
+            self._set_state(ColorState.from_hsv((h, s, v), self._state.alpha),
+                            skip=("hsv",))
 
     def _update_color_rgb(self, event=None):
         """Update display after a change in the RGB spinboxes."""
@@ -519,46 +688,204 @@ class ColorPicker(tk.Toplevel):
             r = self.red.get()
             g = self.green.get()
             b = self.blue.get()
-            h, s, v = rgb_to_hsv(r, g, b)
-            self.hue.set(h)
-            self.saturation.set(s)
-            self.value.set(v)
-            args = (r, g, b)
-            if self.alpha_channel:
-                args += (self.alpha.get(),)
-                self.alphabar.set_color(args)
-            hexa = rgb_to_hexa(*args)
-            self.hexa.delete(0, "end")
-            self.hexa.insert(0, hexa)
-            self.square.set_hsv((h, s, v))
-            self.bar.set(h)
-            self._update_preview()
+            self._set_state(ColorState((r, g, b), alpha=self._state.alpha),
+                            skip=("rgb",))
 
     def ok(self):
-        rgb, hsv, hexa = self.square.get()
+        state = self._state
+        rgb = state.rgb
         if self.alpha_channel:
-            hexa = self.hexa.get()
-            rgb += (self.alpha.get(),)
-        self.color = rgb, hsv, hexa
-        self.destroy()
+            rgb += (state.alpha,)
+        self.color = rgb, state.hsv, state.hexa
+        if self._history is not None:
+            try:
+                self._history.add(rgb)
+            except (IOError, OSError):
+                # the history is not essential: do not prevent the selection
+                pass
+        self._close()
+
+
+class DialogPool(object):
+    """
+    Pool of pre-built ColorPicker dialogs reused by askcolor.
+
+    When a pooled dialog is closed, it is withdrawn instead of being
+    destroyed and the next askcolor call with the same parent toplevel,
+    alpha support, color names, palette, history and history size only
+    resets and displays it.
+    """
+
+    def __init__(self, maxsize=4, idle_timeout=300):
+        """
+        Create a DialogPool.
+
+        Arguments:
+            * maxsize: maximum number of withdrawn dialogs kept in the pool,
+                       the least recently used ones are destroyed first
+            * idle_timeout: delay (in seconds) after which a withdrawn dialog
+                            is destroyed, set it to None to keep the dialogs
+                            until the pool is cleared
+        """
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._dialogs = OrderedDict()  # key (see _get_key): withdrawn dialog
+        self._timers = {}  # key: (dialog, eviction after id)
+
+    def __len__(self):
+        return len(self._dialogs)
+
+    @staticmethod
+    def _get_key(parent, alpha, color_names, palette, history, history_size):
+        if parent is None:
+            parent = tk._default_root
+        if parent is None:
+            return None
+        palette = tuple(c if isinstance(c, string_types) else tuple(c)
+                        for c in palette)
+        return (parent.winfo_toplevel(), bool(alpha), color_names, palette,
+                history, history_size)
+
+    def acquire(self, parent=None, color=(255, 0, 0), alpha=False,
+                title=None, prewarm=False,
+                refresh_rate=REFRESH_RATE, color_names=None, palette=PALETTE,
+                history=None, history_size=HISTORY_SIZE):
+        """
+        Return a displayed ColorPicker dialog.
 
+        A withdrawn dialog for the same parent toplevel, alpha support,
+        color names, palette and history is reused if there is one,
+        otherwise a new dialog is created. The arguments are the ones of
+        ColorPicker, prewarm and refresh_rate are only used when a new dialog
+        is created.
+        """
+        if title is None:
+            title = _("Color Chooser")
+        if color_names is True:
+            color_names = get_default_color_names()
+        key = self._get_key(parent, alpha, color_names, palette, history,
+                            history_size)
+        dialog = self._dialogs.pop(key, None)
+        self._cancel_timer(key)
+        if dialog is not None and self._exists(dialog):
+            try:
+                dialog.reset(color, title)
+            except Exception:
+                # the dialog is no longer in the pool
+                dialog.destroy()
+                raise
+            dialog.show()
+        else:
+            dialog = ColorPicker(parent, color, alpha, title, prewarm,
+                                 refresh_rate, color_names, palette, history,
+                                 history_size)
+            if key is None:
+                key = self._get_key(dialog.master, alpha, color_names, palette,
+                                    history, history_size)
+            dialog._pool = self
+            dialog._pool_key = key
+        return dialog
+
+    def release(self, dialog):
+        """Put the withdrawn dialog back in the pool."""
+        key = dialog._pool_key
+        old = self._dialogs.pop(key, None)
+        if old is not None and old is not dialog:
+            self._destroy(old, key)
+        self._dialogs[key] = dialog
+        while len(self._dialogs) > self.maxsize:
+            self._destroy(*self._dialogs.popitem(last=False)[::-1])
+        if key in self._dialogs and self.idle_timeout is not None:
+            timer_id = dialog.after(int(self.idle_timeout * 1000), self._evict, key)
+            self._timers[key] = dialog, timer_id
 
-def askcolor(color="red", parent=None, title=_("Color Chooser"), alpha=False):
+    @staticmethod
+    def _exists(dialog):
+        try:
+            return bool(dialog.winfo_exists())
+        except tk.TclError:
+            # the application has been destroyed
+            return False
+
+    def _cancel_timer(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            dialog, timer_id = timer
+            try:
+                dialog.after_cancel(timer_id)
+            except tk.TclError:
+                pass
+
+    def _destroy(self, dialog, key):
+        """Destroy a dialog removed from the pool."""
+        self._cancel_timer(key)
+        dialog._pool = None
+        try:
+            dialog.destroy()
+        except tk.TclError:
+            pass
+
+    def _evict(self, key):
+        """Destroy the idle dialog corresponding to key."""
+        self._timers.pop(key, None)
+        dialog = self._dialogs.pop(key, None)
+        if dialog is not None:
+            self._destroy(dialog, key)
+
+    def clear(self):
+        """Destroy all the withdrawn dialogs."""
+        for key in list(self._dialogs):
+            self._cancel_timer(key)
+            self._destroy(self._dialogs.pop(key), key)
+
+
+def askcolor(color="red", parent=None, title=None, alpha=False,
+             prewarm=False, refresh_rate=REFRESH_RATE, pool=None,
+             color_names=None, palette=PALETTE, history=None,
+             history_size=HISTORY_SIZE, as_color=False):
     """
     Open a ColorPicker dialog and return the chosen color.
 
     The selected color is retunred in RGB(A) and hexadecimal #RRGGBB(AA) formats.
     (None, None) is returned if the color selection is cancelled.
+    If as_color is True, the selected color is returned as a Color (which
+    unpacks like the RGB(A) tuple) and None if the selection is cancelled.
 
     Arguments:
         * color: initially selected color (RGB(A), hexa or tkinter color name)
         * parent: parent window
-        * title: dialog title
+        * title: dialog title (translation of "Color Chooser" by default)
         * alpha: alpha channel suppport
+        * prewarm: render the color square gradients of the hues closest to
+                   the initial one (within the cache budget of the
+                   ColorSquare) in a background thread when the dialog opens
+        * refresh_rate: maximum number of display updates per second while
+                        dragging the selection cross
+        * pool: DialogPool, reuse a withdrawn dialog of the pool instead of
+                creating a new one and put it back in the pool when closed
+        * color_names: display the name of the closest named color next to
+                       the HTML entry, either True to use the X11/Tk color
+                       names or a ColorNameIndex
+        * palette: list of the palette colors (RGB tuples, hexadecimal
+                   notation or color names)
+        * history: display the recently selected colors, stored in the file
+                   history (True for the default location), and add the
+                   selected color to them
+        * history_size: number of colors in the history
+        * as_color: return a Color instead of the (RGB(A), hexa) tuple
     """
-    col = ColorPicker(parent, color, alpha, title)
-    col.wait_window(col)
+    if pool is None:
+        col = ColorPicker(parent, color, alpha, title, prewarm, refresh_rate,
+                          color_names, palette, history, history_size)
+        col.wait_window(col)
+    else:
+        col = pool.acquire(parent, color, alpha, title, prewarm, refresh_rate,
+                           color_names, palette, history, history_size)
+        if col._opened.get():
+            col.wait_variable(col._opened)
     res = col.get_color()
+    if as_color:
+        return Color(*res[0]) if res else None
     if res:
         return res[0], res[2]
     else:
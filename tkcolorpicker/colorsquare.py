@@ -20,13 +20,36 @@ Color square gradient with selection cross
 """
 
 
-from tkcolorpicker.functions import tk, round2, rgb_to_hexa, hue2col, rgb_to_hsv
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from tkcolorpicker.functions import tk
+from tkcolorpicker.core import round2, rgb_to_hexa, rgb_to_hsv, \
+    color_square_data, color_square_pixel, ppm_data, LRUCache, ColorState, \
+    Color
+from tkcolorpicker.notifier import Notifier
 
+# memory budget of the rendered gradient cache of each ColorSquare (bytes)
+CACHE_SIZE = 16 * 1024 ** 2
+# number of pre-rendered gradients loaded in photo images at each main loop
+# iteration and delay (ms) between two iterations
+PREWARM_BATCH = 8
+PREWARM_DELAY = 10
 
-class ColorSquare(tk.Canvas):
-    """Square color gradient with selection cross."""
 
-    def __init__(self, parent, hue, color=None, height=256, width=256, **kwargs):
+class ColorSquare(tk.Canvas, Notifier):
+    """
+    Square color gradient with selection cross.
+
+    The <<ColorChanged>> event is generated on each change of the selected
+    color, callbacks receiving the new color as a ColorState can also be
+    registered with subscribe (they are called once per main loop iteration).
+    """
+
+    def __init__(self, parent, hue, color=None, height=256, width=256,
+                 cache_size=CACHE_SIZE, prewarm=False, **kwargs):
         """
         Create a ColorSquare.
 
@@ -35,57 +58,182 @@ class ColorSquare(tk.Canvas):
             * hue: color square gradient for given hue (color in top right corner
                    is (hue, 100, 100) in HSV
             * color: initially selected color given in HSV
+            * cache_size: memory budget (in bytes) of the cache of rendered
+                          gradients, set it to 0 to disable the cache
+            * prewarm: render in a background thread the gradients of all
+                       integer hues (within the cache budget, closest hues
+                       first) as soon as the widget is displayed
             * width, height and any keyword option accepted by a tkinter Canvas
         """
         tk.Canvas.__init__(self, parent, height=height, width=width, **kwargs)
         self.bg = tk.PhotoImage(width=width, height=height, master=self)
+        self._bg_key = (None, width, height)
+        self._cache = LRUCache(cache_size)
+        self._prewarm = prewarm
+        self._prewarm_stop = None
+        self._prewarm_queue = None
+        self._prewarm_id = None
+        self._prewarm_size = (width, height)
+        self._prewarm_total = 0
+        self._prewarm_done = 0
         self._hue = hue
         if not color:
-            color = hue2col(self._hue)
-        self.bind('<Configure>', lambda e: self._draw(color))
+            color = (hue, 100, 100)
+        # geometry and cross position, kept on python side to avoid
+        # querying tkinter on every color change
+        self._width = int(width)
+        self._height = int(height)
+        self._set_cross_position(color)
+        # the canvas items are created once and updated in place
+        self.create_image(0, 0, image=self.bg, anchor="nw", tags="bg")
+        self.create_line(0, 0, 0, 0, tags="cross_h", fill="#C2C2C2")
+        self.create_line(0, 0, 0, 0, tags="cross_v", fill="#C2C2C2")
+        self.bind('<Configure>', self._on_configure)
         self.bind('<ButtonPress-1>', self._on_click)
         self.bind('<B1-Motion>', self._on_move)
+        self.bind('<Destroy>', self._on_destroy, True)
+        self._init_notifier()
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.cancel_prewarm()
+
+    def _on_configure(self, event):
+        """Redraw the gradient and the cross at the new size."""
+        color = self._get_hsv()
+        self._width = event.width
+        self._height = event.height
+        self._draw(color)
 
     def _fill(self):
-        """Create the gradient."""
-        r, g, b = hue2col(self._hue)
-        width = self.winfo_width()
-        height = self.winfo_height()
-        h = float(height - 1)
-        w = float(width - 1)
-        if height:
-            c = [(r + i / h * (255 - r), g + i / h * (255 - g), b + i / h * (255 - b)) for i in range(height)]
-            data = []
-            for i in range(height):
-                line = []
-                for j in range(width):
-                    rij = round2(j / w * c[i][0])
-                    gij = round2(j / w * c[i][1])
-                    bij = round2(j / w * c[i][2])
-                    color = rgb_to_hexa(rij, gij, bij)
-                    line.append(color)
-                data.append("{" + " ".join(line) + "}")
-            self.bg.put(" ".join(data))
+        """Create the gradient (or retrieve it from the cache)."""
+        width = self._width
+        height = self._height
+        key = (self._hue, width, height)
+        bg = self._cache.get(key)
+        if bg is None:
+            # draw the requested hue right away, the pre-rendered gradients
+            # are loaded by _prewarm_poll to keep the hue changes responsive
+            if self._bg_key[1:] == key[1:] and self._bg_key not in self._cache:
+                # the current image is not cached: draw the gradient in it
+                bg = self.bg
+            else:
+                bg = tk.PhotoImage(width=width, height=height, master=self)
+            if height:
+                data = color_square_data(self._hue, width, height)
+                bg.put(ppm_data(data, width, height))
+            self._cache.put(key, bg, 4 * width * height)
+        self._bg_key = key
+        if bg is not self.bg:
+            self.bg = bg
+            self.itemconfigure("bg", image=self.bg)
 
     def _draw(self, color):
         """Draw the gradient and the selection cross on the canvas."""
-        width = self.winfo_width()
-        height = self.winfo_height()
-        self.delete("bg")
-        self.delete("cross_h")
-        self.delete("cross_v")
-        del self.bg
-        self.bg = tk.PhotoImage(width=width, height=height, master=self)
         self._fill()
-        self.create_image(0, 0, image=self.bg, anchor="nw", tags="bg")
-        self.tag_lower("bg")
-        h, s, v = color
-        x = v / 100.
-        y = (1 - s / 100.)
-        self.create_line(0, y * height, width, y * height, tags="cross_h",
-                         fill="#C2C2C2")
-        self.create_line(x * width, 0, x * width, height, tags="cross_v",
-                         fill="#C2C2C2")
+        self._set_cross_position(color)
+        self._move_cross(self._x, self._y)
+        if self._prewarm:
+            self.prewarm()
+
+    # --- background rendering
+    @staticmethod
+    def _prewarm_worker(hues, width, height, stop, output):
+        """Render the gradients for hues (executed in a separate thread)."""
+        for hue in hues:
+            if stop.is_set():
+                return
+            data = color_square_data(hue, width, height)
+            output.put((hue, ppm_data(data, width, height)))
+
+    def _prewarm_load(self, nb):
+        """Load at most nb pre-rendered gradients in photo images."""
+        width, height = self._prewarm_size
+        for i in range(nb):
+            try:
+                hue, data = self._prewarm_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._prewarm_done += 1
+            key = (hue, width, height)
+            if key not in self._cache:
+                bg = tk.PhotoImage(width=width, height=height, master=self)
+                bg.put(data)
+                self._cache.put(key, bg, 4 * width * height)
+
+    def _prewarm_poll(self):
+        """Hand pre-rendered gradients over to tkinter."""
+        self._prewarm_load(PREWARM_BATCH)
+        if self._prewarm_done < self._prewarm_total:
+            self._prewarm_id = self.after(PREWARM_DELAY, self._prewarm_poll)
+        else:
+            self._prewarm_id = None
+
+    def prewarm(self):
+        """
+        Render the gradients of all integer hues in a background thread.
+
+        Only as many gradients as the cache budget allows are rendered,
+        i.e. min(361, cache.maxsize // (4 * width * height)) gradients (64
+        for the default 16 MB budget and a 256 x 256 square), starting with
+        the hues closest to the current one. The rendering
+        is done outside of the main thread, the loading of the result in
+        photo images is scheduled with after.
+        """
+        self.cancel_prewarm()
+        width = self._width
+        height = self._height
+        nb = min(361, self._cache.maxsize // max(4 * width * height, 1))
+        hue = round2(self._hue)
+        hues = sorted(range(361), key=lambda h: abs(h - hue))[:nb]
+        hues = [h for h in hues if (h, width, height) not in self._cache]
+        self._prewarm_size = width, height
+        self._prewarm_total = len(hues)
+        self._prewarm_done = 0
+        if not hues:
+            return
+        self._prewarm_stop = threading.Event()
+        self._prewarm_queue = queue.Queue()
+        thread = threading.Thread(target=self._prewarm_worker,
+                                  args=(hues, width, height,
+                                        self._prewarm_stop, self._prewarm_queue))
+        thread.daemon = True
+        thread.start()
+        self._prewarm_id = self.after(PREWARM_DELAY, self._prewarm_poll)
+
+    def cancel_prewarm(self):
+        """Stop the background rendering of the gradients."""
+        if self._prewarm_stop is not None:
+            self._prewarm_stop.set()
+        if self._prewarm_id is not None:
+            self.after_cancel(self._prewarm_id)
+        self._prewarm_stop = None
+        self._prewarm_queue = None
+        self._prewarm_id = None
+        self._prewarm_total = self._prewarm_done
+
+    def prewarm_progress(self):
+        """
+        Return the progress of the background rendering.
+
+        The result is (nb of loaded gradients, nb of gradients to render).
+        """
+        return self._prewarm_done, self._prewarm_total
+
+    def check_items(self):
+        """
+        Return the number of canvas items (debugging helper).
+
+        Raise an AssertionError if the canvas does not contain exactly the
+        gradient image and the two lines of the cross.
+        """
+        nb = len(self.find_all())
+        assert nb == 3, "ColorSquare contains %i canvas items instead of 3" % nb
+        return nb
+
+    def cache_info(self):
+        """Return the statistics of the rendered gradient cache."""
+        return self._cache.info()
 
     def get_hue(self):
         """Return hue."""
@@ -97,61 +245,67 @@ class ColorSquare(tk.Canvas):
         self._hue = value
         if value != old:
             self._fill()
-            self.event_generate("<<ColorChanged>>")
+            self._changed()
+
+    def _set_cross_position(self, color):
+        """Set the cross position corresponding to color given in HSV."""
+        h, s, v = color
+        self._x = v / 100. * self._width
+        self._y = (1 - s / 100.) * self._height
+
+    def _move_cross(self, x, y):
+        """Move the cross to (x, y)."""
+        self._x = x
+        self._y = y
+        self.coords('cross_h', 0, y, self._width, y)
+        self.coords('cross_v', x, 0, x, self._height)
+
+    def _get_hsv(self):
+        """Return the HSV color under the cross."""
+        s = round2((1 - float(self._y) / self._height) * 100)
+        v = round2(100 * float(self._x) / self._width)
+        return self._hue, s, v
+
+    def _changed(self):
+        """Notify a change of the selected color."""
+        self.event_generate("<<ColorChanged>>")
+        self._notify()
+
+    def _get_notify_value(self):
+        rgb, hsv, hexa = self.get()
+        return ColorState(rgb, hsv)
 
     def _on_click(self, event):
         """Move cross on click."""
-        x = event.x
-        y = event.y
-        self.coords('cross_h', 0, y, self.winfo_width(), y)
-        self.coords('cross_v', x, 0, x, self.winfo_height())
-        self.event_generate("<<ColorChanged>>")
+        self._move_cross(event.x, event.y)
+        self._changed()
 
     def _on_move(self, event):
         """Make the cross follow the cursor."""
-        w = self.winfo_width()
-        h = self.winfo_height()
-        x = min(max(event.x, 0), w)
-        y = min(max(event.y, 0), h)
-        self.coords('cross_h', 0, y, w, y)
-        self.coords('cross_v', x, 0, x, h)
-        self.event_generate("<<ColorChanged>>")
+        x = min(max(event.x, 0), self._width)
+        y = min(max(event.y, 0), self._height)
+        self._move_cross(x, y)
+        self._changed()
+
+    def get(self, as_color=False):
+        """
+        Return selected color with format (RGB, HSV, HEX).
 
-    def get(self):
-        """Return selected color with format (RGB, HSV, HEX)."""
-        x = self.coords('cross_v')[0]
-        y = self.coords('cross_h')[1]
-        xp = min(x, self.bg.width() - 1)
-        yp = min(y, self.bg.height() - 1)
-        try:
-            r, g, b = self.bg.get(round2(xp), round2(yp))
-        except ValueError:
-            r, g, b = self.bg.get(round2(xp), round2(yp)).split()
-            r, g, b = int(r), int(g), int(b)
-        hexa = rgb_to_hexa(r, g, b)
-        h = self.get_hue()
-        s = round2((1 - float(y) / self.winfo_height()) * 100)
-        v = round2(100 * float(x) / self.winfo_width())
-        return (r, g, b), (h, s, v), hexa
+        If as_color is True, return the selected color as a Color instead.
+        """
+        xp = round2(min(self._x, self._width - 1))
+        yp = round2(min(self._y, self._height - 1))
+        r, g, b = color_square_pixel(self._hue, xp, yp, self._width, self._height)
+        if as_color:
+            return Color(r, g, b)
+        return (r, g, b), self._get_hsv(), rgb_to_hexa(r, g, b)
 
     def set_rgb(self, sel_color):
         """Put cursor on sel_color given in RGB."""
-        width = self.winfo_width()
-        height = self.winfo_height()
-        h, s, v = rgb_to_hsv(*sel_color)
-        self.set_hue(h)
-        x = v / 100.
-        y = (1 - s / 100.)
-        self.coords('cross_h', 0, y * height, width, y * height)
-        self.coords('cross_v', x * width, 0, x * width, height)
+        self.set_hsv(rgb_to_hsv(*sel_color))
 
     def set_hsv(self, sel_color):
         """Put cursor on sel_color given in HSV."""
-        width = self.winfo_width()
-        height = self.winfo_height()
-        h, s, v = sel_color
-        self.set_hue(h)
-        x = v / 100.
-        y = (1 - s / 100.)
-        self.coords('cross_h', 0, y * height, width, y * height)
-        self.coords('cross_v', x * width, 0, x * width, height)
+        self.set_hue(sel_color[0])
+        self._set_cross_position(sel_color)
+        self._move_cross(self._x, self._y)
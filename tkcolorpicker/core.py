@@ -0,0 +1,882 @@
+# -*- coding: utf-8 -*-
+"""
+tkcolorpicker - Alternative to colorchooser for Tkinter.
+Copyright 2017 Juliette Monsel <j_4321@protonmail.com>
+
+tkcolorpicker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+tkcolorpicker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Color model and rendering functions and constants
+
+This module does not import tkinter so that it can be used without a
+display (see tkcolorpicker.functions for the tkinter layer). Before
+Python 3.7, the package still imports the widgets, and thus tkinter,
+when tkinter and Pillow are installed.
+"""
+
+
+from math import atan2, sqrt, pi
+from binascii import hexlify
+from collections import OrderedDict, namedtuple
+import colorsys
+import sys
+
+# numpy is optional and only imported on first use (see _get_numpy)
+np = None
+_numpy_checked = False
+
+
+PALETTE = ("red", "dark red", "orange", "yellow", "green", "lightgreen", "blue",
+           "royal blue", "sky blue", "purple", "magenta", "pink", "black",
+           "white", "gray", "saddle brown", "lightgray", "wheat")
+
+
+# in some python versions round returns a float instead of an int
+if not isinstance(round(1.0), int):
+    def round2(nb):
+        """Round number to 0 digits and return an int."""
+        return int(nb + 0.5)  # works because nb >= 0
+else:
+    round2 = round
+
+# str and unicode in python 2
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+# --- conversion functions
+def rgb_to_hsv(r, g, b):
+    """Convert RGB color to HSV."""
+    h, s, v = colorsys.rgb_to_hsv(r / 255., g / 255., b / 255.)
+    return round2(h * 360), round2(s * 100), round2(v * 100)
+
+
+def hsv_to_rgb(h, s, v):
+    """Convert HSV color to RGB."""
+    r, g, b = colorsys.hsv_to_rgb(h / 360., s / 100., v / 100.)
+    return round2(r * 255), round2(g * 255), round2(b * 255)
+
+
+# hexadecimal notation of the integers between 0 and 255
+_HEXA_TABLE = tuple("%2.2X" % i for i in range(256))
+
+
+def rgb_to_hexa(*args):
+    """Convert RGB(A) color to hexadecimal."""
+    if len(args) == 3:
+        r, g, b = args
+        if 0 <= r < 256 and 0 <= g < 256 and 0 <= b < 256:
+            try:
+                return "#" + _HEXA_TABLE[r] + _HEXA_TABLE[g] + _HEXA_TABLE[b]
+            except TypeError:
+                pass
+        return ("#%2.2x%2.2x%2.2x" % tuple(args)).upper()
+    elif len(args) == 4:
+        r, g, b, a = args
+        if 0 <= r < 256 and 0 <= g < 256 and 0 <= b < 256 and 0 <= a < 256:
+            try:
+                return "#" + _HEXA_TABLE[r] + _HEXA_TABLE[g] + _HEXA_TABLE[b] + _HEXA_TABLE[a]
+            except TypeError:
+                pass
+        return ("#%2.2x%2.2x%2.2x%2.2x" % tuple(args)).upper()
+    else:
+        raise ValueError("Wrong number of arguments.")
+
+
+def hexa_to_rgb(color):
+    """Convert hexadecimal color to RGB."""
+    r = int(color[1:3], 16)
+    g = int(color[3:5], 16)
+    b = int(color[5:7], 16)
+    if len(color) == 7:
+        return r, g, b
+    elif len(color) == 9:
+        return r, g, b, int(color[7:9], 16)
+    else:
+        raise ValueError("Invalid hexadecimal notation.")
+
+
+def col2hue(r, g, b):
+    """Return hue value corresponding to given RGB color."""
+    return round2(180 / pi * atan2(sqrt(3) * (g - b), 2 * r - g - b) + 360) % 360
+
+
+def _hue2col_colorsys(h):
+    """Return the color in RGB format corresponding to (h, 100, 100) in HSV."""
+    return hsv_to_rgb(h, 100, 100)
+
+
+# colors corresponding to the integer hues
+_HUE2COL_TABLE = tuple(_hue2col_colorsys(h) for h in range(361))
+
+
+def _hue2col_fractional(h):
+    """
+    Return the color in RGB format corresponding to (h, 100, 100) in HSV.
+
+    Same computation as colorsys.hsv_to_rgb with s = v = 1, the results
+    are identical.
+    """
+    h6 = h / 360. * 6.0
+    i = int(h6)
+    f = h6 - i
+    i = i % 6
+    if i == 0:
+        return 255, round2((1.0 - (1.0 - f)) * 255), 0
+    elif i == 1:
+        return round2((1.0 - f) * 255), 255, 0
+    elif i == 2:
+        return 0, 255, round2((1.0 - (1.0 - f)) * 255)
+    elif i == 3:
+        return 0, round2((1.0 - f) * 255), 255
+    elif i == 4:
+        return round2((1.0 - (1.0 - f)) * 255), 0, 255
+    else:
+        return 255, 0, round2((1.0 - f) * 255)
+
+
+def hue2col(h):
+    """Return the color in RGB format corresponding to (h, 100, 100) in HSV."""
+    if h < 0 or h > 360:
+        raise ValueError("Hue should be between 0 and 360")
+    if isinstance(h, float):
+        return _hue2col_fractional(h)
+    try:
+        return _HUE2COL_TABLE[h]
+    except TypeError:
+        return _hue2col_fractional(h)
+
+
+def _get_numpy():
+    """Import numpy on first call and return it (None if it is not installed)."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+# --- batch conversion functions (numpy arrays if numpy is available)
+def _round_array(a):
+    """Round array like round2 and return an integer array."""
+    if round2 is round:
+        return np.rint(a).astype(int)
+    else:
+        return np.floor(a + 0.5).astype(int)
+
+
+def _check_colors(colors, sizes=(3, 4)):
+    """Return colors as an array, raise a ValueError if its shape is invalid."""
+    colors = np.asarray(colors)
+    if colors.ndim != 2 or colors.shape[1] not in sizes:
+        raise ValueError("Colors should be given in a N x %s array."
+                         % " or N x ".join(str(n) for n in sizes))
+    return colors
+
+
+def rgb_to_hsv_array(colors):
+    """
+    Convert RGB(A) colors (N x 3 or N x 4 array) to HSV (N x 3 array).
+
+    The results are identical to the ones of rgb_to_hsv.
+    """
+    if _get_numpy() is None:
+        return [rgb_to_hsv(*c[:3]) for c in colors]
+    rgb = _check_colors(colors)[:, :3] / 255.
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(-1)
+    minc = rgb.min(-1)
+    rangec = maxc - minc
+    gray = minc == maxc
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = rangec / maxc
+        rc = (maxc - r) / rangec
+        gc = (maxc - g) / rangec
+        bc = (maxc - b) / rangec
+    h = np.where(r == maxc, bc - gc,
+                 np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = (h / 6.0) % 1.0
+    h[gray] = 0
+    s[gray] = 0
+    return _round_array(np.stack([h * 360, s * 100, maxc * 100], -1))
+
+
+def hsv_to_rgb_array(colors):
+    """
+    Convert HSV colors (N x 3 array) to RGB (N x 3 array).
+
+    The results are identical to the ones of hsv_to_rgb.
+    """
+    if _get_numpy() is None:
+        return [hsv_to_rgb(*c) for c in colors]
+    hsv = _check_colors(colors, (3,)).astype(float)
+    h = hsv[..., 0] / 360.
+    s = hsv[..., 1] / 100.
+    v = hsv[..., 2] / 100.
+    i = (h * 6.0).astype(int)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    rgb = np.stack([r, g, b], -1)
+    gray = s == 0
+    rgb[gray] = v[gray, None]
+    return _round_array(rgb * 255)
+
+
+def rgb_to_hexa_array(colors):
+    """
+    Convert RGB(A) colors (N x 3 or N x 4 array) to hexadecimal notation.
+
+    The values should be integers between 0 and 255, like for rgb_to_hexa
+    a TypeError is raised for floats.
+    """
+    if _get_numpy() is None:
+        return [rgb_to_hexa(*c) for c in colors]
+    colors = _check_colors(colors)
+    if colors.size and colors.dtype.kind not in "iub":
+        raise TypeError("Color values should be integers.")
+    if colors.size and (colors.min() < 0 or colors.max() > 255):
+        raise ValueError("Color values should be between 0 and 255.")
+    n = 2 * colors.shape[1]
+    data = hexlify(colors.astype(np.uint8).tobytes()).upper()
+    hexa = np.frombuffer(data, dtype="S%i" % n).astype("U%i" % n)
+    return np.char.add("#", hexa)
+
+
+def hexa_to_rgb_array(colors):
+    """
+    Convert colors in hexadecimal notation to RGB(A) (N x 3 or N x 4 array).
+
+    All the colors should have the same format (#RRGGBB or #RRGGBBAA).
+    """
+    if _get_numpy() is None:
+        return [hexa_to_rgb(c) for c in colors]
+    colors = list(colors)
+    if not colors:
+        return np.zeros((0, 3), dtype=int)
+    length = len(colors[0])
+    if length not in (7, 9) or any(len(c) != length for c in colors):
+        raise ValueError("Invalid hexadecimal notation.")
+    data = bytearray.fromhex(u"".join(c[1:] for c in colors))
+    data = np.frombuffer(bytes(data), dtype=np.uint8)
+    return data.reshape(len(colors), (length - 1) // 2).astype(int)
+
+
+def col2hue_array(colors):
+    """
+    Return the hue values corresponding to RGB(A) colors (N x 3 or N x 4 array).
+
+    The results are identical to the ones of col2hue.
+    """
+    if _get_numpy() is None:
+        return [col2hue(*c[:3]) for c in colors]
+    rgb = _check_colors(colors).astype(int)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    angle = np.arctan2(sqrt(3) * (g - b), (2 * r - g - b).astype(float))
+    return _round_array(180 / pi * angle + 360) % 360
+
+
+# --- color state
+class ColorState(namedtuple("ColorState", "rgb hsv alpha hexa")):
+    """
+    Immutable color state: RGB, HSV, alpha and hexadecimal notation.
+
+    The derived values are computed once, when the state is created.
+    """
+    __slots__ = ()
+
+    def __new__(cls, rgb, hsv=None, alpha=None):
+        """
+        Create a ColorState.
+
+        Arguments:
+            * rgb: color in RGB
+            * hsv: color in HSV, computed from rgb if not given
+            * alpha: alpha value, None if there is no alpha channel
+        """
+        rgb = tuple(rgb)
+        if hsv is None:
+            hsv = rgb_to_hsv(*rgb)
+        if alpha is None:
+            hexa = rgb_to_hexa(*rgb)
+        else:
+            hexa = rgb_to_hexa(*(rgb + (alpha,)))
+        return super(ColorState, cls).__new__(cls, rgb, tuple(hsv), alpha, hexa)
+
+    @classmethod
+    def from_hsv(cls, hsv, alpha=None):
+        """Create a ColorState from a color given in HSV."""
+        return cls(hsv_to_rgb(*hsv), hsv, alpha)
+
+    def with_alpha(self, alpha):
+        """Return the same color with a new alpha value."""
+        return ColorState(self.rgb, self.hsv, alpha)
+
+
+# interned Color instances of the named colors (see _get_interned)
+_interned = None
+_setattr = object.__setattr__
+
+
+def _pack(r, g, b, alpha=None):
+    """
+    Return the packed RGBA value of a Color.
+
+    Bit 32 is set when the color has no alpha channel (alpha byte 255).
+    """
+    if alpha is None:
+        return r << 24 | g << 16 | b << 8 | 255 | 1 << 32
+    return r << 24 | g << 16 | b << 8 | alpha
+
+
+def _get_interned():
+    """Return the interned colors: the X11/Tk named colors (created once)."""
+    global _interned
+    if _interned is None:
+        from tkcolorpicker.colorspec import COLOR_NAMES
+        interned = {}
+        for rgb in COLOR_NAMES.values():
+            key = _pack(*rgb)
+            if key not in interned:
+                color = object.__new__(Color)
+                _setattr(color, "_value", key)
+                interned[key] = color
+        _interned = interned
+    return _interned
+
+
+class Color(object):
+    """
+    Immutable color in RGB or RGBA.
+
+    The color is stored as a single packed RGBA integer, the other
+    representations (HSV, hexadecimal notation) and the hash are derived from
+    it on first access and cached. A Color behaves like the corresponding RGB(A) tuple: it can be
+    unpacked, indexed and compared to tuples. The colors without alpha
+    channel matching a X11/Tk color name (which include the default
+    palette) are interned: creating them returns a shared instance.
+    """
+
+    __slots__ = ("_value", "_hsv", "_hexa", "_hash")
+
+    def __new__(cls, r, g, b, alpha=None):
+        """
+        Create a Color.
+
+        Arguments:
+            * r, g, b: red, green and blue values (integers between 0 and 255)
+            * alpha: alpha value, None if the color has no alpha channel
+        """
+        if not (0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255 and
+                (alpha is None or 0 <= alpha <= 255)):
+            raise ValueError("Color components should be between 0 and 255.")
+        try:
+            if alpha is None:
+                key = int(r << 24 | g << 16 | b << 8 | 255 | 1 << 32)
+            else:
+                key = int(r << 24 | g << 16 | b << 8 | alpha)
+        except TypeError:
+            raise ValueError("Color components should be integers.")
+        if cls is Color and alpha is None:
+            color = (_interned or _get_interned()).get(key)
+            if color is not None:
+                return color
+        self = object.__new__(cls)
+        _setattr(self, "_value", key)
+        return self
+
+    @classmethod
+    def from_hsv(cls, h, s, v, alpha=None):
+        """
+        Create a Color from HSV values.
+
+        The hsv attribute of the result is derived from its RGB values.
+        """
+        return cls(*hsv_to_rgb(h, s, v), alpha=alpha)
+
+    @classmethod
+    def from_hexa(cls, color):
+        """Create a Color from its #RRGGBB(AA) hexadecimal notation."""
+        return cls(*hexa_to_rgb(color))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Color objects are immutable.")
+
+    __delattr__ = __setattr__
+
+    def __reduce__(self):
+        return (self.__class__, tuple(self))
+
+    @property
+    def value(self):
+        """Packed RGBA integer (the alpha byte is 255 without alpha channel)."""
+        return self._value & 0xFFFFFFFF
+
+    @property
+    def rgb(self):
+        """RGB tuple."""
+        value = self._value
+        return (value >> 24) & 255, (value >> 16) & 255, (value >> 8) & 255
+
+    @property
+    def rgba(self):
+        """RGBA tuple (alpha is 255 without alpha channel)."""
+        value = self._value
+        return ((value >> 24) & 255, (value >> 16) & 255, (value >> 8) & 255,
+                value & 255)
+
+    @property
+    def alpha(self):
+        """Alpha value, None if the color has no alpha channel."""
+        return None if self._value >> 32 else self._value & 255
+
+    @property
+    def hsv(self):
+        """HSV tuple."""
+        try:
+            return self._hsv
+        except AttributeError:
+            hsv = rgb_to_hsv(*self.rgb)
+            _setattr(self, "_hsv", hsv)
+            return hsv
+
+    @property
+    def hexa(self):
+        """Hexadecimal notation #RRGGBB(AA)."""
+        try:
+            return self._hexa
+        except AttributeError:
+            hexa = rgb_to_hexa(*self)
+            _setattr(self, "_hexa", hexa)
+            return hexa
+
+    def with_alpha(self, alpha):
+        """Return the same color with a new alpha value."""
+        return self.__class__(*self.rgb, alpha=alpha)
+
+    def __len__(self):
+        return 3 if self._value >> 32 else 4
+
+    def __iter__(self):
+        return iter(self.rgba[:len(self)])
+
+    def __getitem__(self, index):
+        return self.rgba[:len(self)][index]
+
+    def __eq__(self, other):
+        if isinstance(other, Color):
+            return self._value == other._value
+        if isinstance(other, tuple):
+            return self.rgba[:len(self)] == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        res = self.__eq__(other)
+        return res if res is NotImplemented else not res
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            # same hash as the equal tuple
+            h = hash(self.rgba[:len(self)])
+            _setattr(self, "_hash", h)
+            return h
+
+    def __repr__(self):
+        return "Color(%s)" % ", ".join(str(c) for c in self)
+
+
+# --- cache
+class LRUCache(object):
+    """
+    Least recently used cache with a memory budget.
+
+    Each value is stored with its size (in bytes) and the least recently
+    used values are evicted when the total size exceeds the budget.
+    """
+
+    def __init__(self, maxsize):
+        """
+        Create a LRUCache.
+
+        Arguments:
+            * maxsize: memory budget in bytes
+        """
+        self.maxsize = maxsize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the value cached for key (default if there is none)."""
+        try:
+            item = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data[key] = item
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, value, size):
+        """Cache value for key, evicting older values if needed."""
+        if key in self._data:
+            self.size -= self._data.pop(key)[1]
+        if size > self.maxsize:
+            return
+        self._data[key] = value, size
+        self.size += size
+        while self.size > self.maxsize:
+            self.size -= self._data.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all cached values."""
+        self._data.clear()
+        self.size = 0
+
+    def info(self):
+        """Return the cache statistics."""
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "count": len(self._data),
+                "size": self.size, "maxsize": self.maxsize}
+
+
+# --- color naming
+def _srgb_to_linear(c):
+    c /= 255.
+    if c <= 0.04045:
+        return c / 12.92
+    return ((c + 0.055) / 1.055) ** 2.4
+
+
+def _lab_f(t):
+    if t > 216 / 24389.:
+        return t ** (1 / 3.)
+    return t * 24389 / 3132. + 4 / 29.
+
+
+def rgb_to_lab(r, g, b):
+    """Convert RGB color to CIE L*a*b* (D65 white point)."""
+    r = _srgb_to_linear(r)
+    g = _srgb_to_linear(g)
+    b = _srgb_to_linear(b)
+    fx = _lab_f((0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / 0.95047)
+    fy = _lab_f(0.2126729 * r + 0.7151522 * g + 0.0721750 * b)
+    fz = _lab_f((0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / 1.08883)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+class ColorNameIndex(object):
+    """
+    Nearest named color search.
+
+    The colors of the palette are stored in a k-d tree so that the closest
+    named color is found in a few microseconds even for large palettes.
+    """
+
+    METRICS = {"rgb": lambda r, g, b: (r, g, b), "lab": rgb_to_lab}
+
+    def __init__(self, palette=None, metric="rgb"):
+        """
+        Create a ColorNameIndex.
+
+        Arguments:
+            * palette: {name: (r, g, b)} dictionary or sequence of
+                       (name, (r, g, b)) pairs, the X11/Tk color names are
+                       used if palette is None
+            * metric: 'rgb' (euclidean distance in RGB space), 'lab'
+                      (euclidean distance in CIE L*a*b* space, closer to
+                      the perceived difference) or a function mapping
+                      r, g, b to the coordinates used for the euclidean
+                      distance
+        """
+        if palette is None:
+            from tkcolorpicker.colorspec import COLOR_NAMES
+            palette = COLOR_NAMES
+        if isinstance(palette, dict):
+            palette = sorted(palette.items())
+        if callable(metric):
+            self._transform = metric
+        else:
+            try:
+                self._transform = self.METRICS[metric]
+            except KeyError:
+                raise ValueError("Unknown metric %r, expected 'rgb', 'lab' "
+                                 "or a function." % (metric,))
+        self.metric = metric
+        # only the first name of each color is kept
+        entries = []
+        colors = set()
+        for name, rgb in palette:
+            rgb = tuple(rgb[:3])
+            if rgb not in colors:
+                colors.add(rgb)
+                entries.append((tuple(self._transform(*rgb)), name, rgb))
+        self._dim = len(entries[0][0]) if entries else 0
+        # flat k-d tree: node i has coordinates _coords[i], palette entry
+        # _entries[i], split axis _axes[i] and children _left[i], _right[i]
+        # (-1 if there is no child)
+        self._coords = []
+        self._entries = []
+        self._axes = []
+        self._left = []
+        self._right = []
+        self._root = self._build(entries, 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _build(self, entries, depth):
+        """Build the k-d tree for entries and return the root node index."""
+        if not entries:
+            return -1
+        axis = depth % self._dim
+        entries.sort(key=lambda e: e[0][axis])
+        median = len(entries) // 2
+        coords, name, rgb = entries[median]
+        node = len(self._coords)
+        self._coords.append(coords)
+        self._entries.append((name, rgb))
+        self._axes.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(entries[:median], depth + 1)
+        self._right[node] = self._build(entries[median + 1:], depth + 1)
+        return node
+
+    def nearest(self, color):
+        """
+        Return the palette color closest to color (RGB).
+
+        The result has the format (name, (r, g, b), distance), distance
+        being computed with the index metric.
+        """
+        point = tuple(self._transform(*color[:3]))
+        coords = self._coords
+        axes = self._axes
+        left = self._left
+        right = self._right
+        best = -1
+        best_dist = float("inf")
+        # stack of (node, squared distance to the splitting plane)
+        stack = [(self._root, 0)]
+        while stack:
+            node, plane_dist = stack.pop()
+            if node < 0 or plane_dist >= best_dist:
+                continue
+            c = coords[node]
+            dist = 0
+            for x, y in zip(point, c):
+                d = x - y
+                dist += d * d
+            if dist < best_dist:
+                best_dist = dist
+                best = node
+            diff = point[axes[node]] - c[axes[node]]
+            if diff < 0:
+                near, far = left[node], right[node]
+            else:
+                near, far = right[node], left[node]
+            stack.append((far, diff * diff))
+            stack.append((near, 0))
+        if best < 0:
+            raise ValueError("The palette is empty.")
+        name, rgb = self._entries[best]
+        return name, rgb, sqrt(best_dist)
+
+
+# --- Color square gradient rendering
+def _color_square_data_numpy(rgb, width, height, w, h):
+    """Compute the color square gradient pixel data with numpy."""
+    c = np.array(rgb, dtype=float)
+    rows = c + (np.arange(height) / h)[:, None] * (255 - c)
+    plane = (np.arange(width) / w)[None, :, None] * rows[:, None, :]
+    if round2 is round:
+        plane = np.rint(plane)
+    else:
+        plane = np.floor(plane + 0.5)
+    return plane.astype(np.uint8).tobytes()
+
+
+def _color_square_data_python(rgb, width, height, w, h):
+    """Compute the color square gradient pixel data in pure python."""
+    r, g, b = rgb
+    x = [j / w for j in range(width)]
+    data = bytearray(3 * width * height)
+    line = bytearray(3 * width)
+    for i in range(height):
+        cr = r + i / h * (255 - r)
+        cg = g + i / h * (255 - g)
+        cb = b + i / h * (255 - b)
+        line[0::3] = bytearray([round2(xj * cr) for xj in x])
+        line[1::3] = bytearray([round2(xj * cg) for xj in x])
+        line[2::3] = bytearray([round2(xj * cb) for xj in x])
+        data[3 * width * i:3 * width * (i + 1)] = line
+    return bytes(data)
+
+
+def get_renderer():
+    """Return the backend used to render the gradients: 'numpy' or 'python'."""
+    return "python" if _get_numpy() is None else "numpy"
+
+
+# RENDERER is deprecated, use get_renderer(): it is computed on access so
+# that numpy is not imported with the module
+if sys.version_info < (3, 7):
+    RENDERER = get_renderer()
+else:
+    def __getattr__(name):
+        if name == "RENDERER":
+            import warnings
+            warnings.warn("RENDERER is deprecated, use get_renderer() instead.",
+                          DeprecationWarning, stacklevel=2)
+            return get_renderer()
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def color_square_data(hue, width, height):
+    """
+    Return the pixel data of the ColorSquare gradient for the given hue.
+
+    The data is returned as bytes, 3 bytes (RGB) per pixel, row by row.
+    The best available backend (see get_renderer) is used.
+    """
+    h = float(max(height - 1, 1))
+    w = float(max(width - 1, 1))
+    if _get_numpy() is None:
+        return _color_square_data_python(hue2col(hue), width, height, w, h)
+    return _color_square_data_numpy(hue2col(hue), width, height, w, h)
+
+
+def color_square_pixel(hue, x, y, width, height):
+    """
+    Return the RGB color of the pixel (x, y) of the ColorSquare gradient.
+
+    The result is identical to the corresponding pixel in color_square_data.
+    """
+    h = float(max(height - 1, 1))
+    w = float(max(width - 1, 1))
+    xw = x / w
+    return tuple(round2(xw * (c + y / h * (255 - c))) for c in hue2col(hue))
+
+
+def hue_strip_data(width):
+    """Return the pixel data (RGB bytes) of one row of the GradientBar hue gradient."""
+    data = bytearray()
+    for i in range(width):
+        data.extend(hue2col(float(i) / width * 360))
+    return bytes(data)
+
+
+def ppm_data(data, width, height):
+    """Return the RGB pixel data in binary PPM format (for tk.PhotoImage)."""
+    header = "P6 %i %i 255\n" % (width, height)
+    return header.encode("ascii") + bytes(data)
+
+
+# --- Fake transparent image creation
+# memory budget (bytes) of the cache of checkered images
+CHECKERED_CACHE_SIZE = 4 * 1024 ** 2
+_checkered_cache = LRUCache(CHECKERED_CACHE_SIZE)
+
+
+def checkered_data(width, height, c1=(154, 154, 154, 255),
+                   c2=(100, 100, 100, 255), s=6):
+    """
+    Return the RGBA pixel data (bytes) of a checkered image.
+
+    Arguments:
+        * width: image width
+        * height: image height
+        * c1: first color (RGBA)
+        * c2: second color (RGBA)
+        * s: size of the squares
+    """
+    a = bytes(bytearray(c1)) * s
+    b = bytes(bytearray(c2)) * s
+    n = width // (2 * s) + 1
+    row1 = ((a + b) * n)[:4 * width]
+    row2 = ((b + a) * n)[:4 * width]
+    band = row1 * s + row2 * s
+    return (band * (height // (2 * s) + 1))[:4 * width * height]
+
+
+def get_checkered_image(width, height, c1=(154, 154, 154, 255),
+                        c2=(100, 100, 100, 255), s=6):
+    """
+    Return a shared checkered image of size width x height.
+
+    The images are cached, so the returned image must not be modified,
+    use create_checkered_image to get an image that can be modified.
+
+    Arguments:
+        * width: image width
+        * height: image height
+        * c1: first color (RGBA)
+        * c2: second color (RGBA)
+        * s: size of the squares
+    """
+    key = (width, height, tuple(c1), tuple(c2), s)
+    im = _checkered_cache.get(key)
+    if im is None:
+        from PIL import Image
+        im = Image.frombytes("RGBA", (width, height),
+                             checkered_data(width, height, c1, c2, s))
+        _checkered_cache.put(key, im, 4 * width * height)
+    return im
+
+
+def create_checkered_image(width, height, c1=(154, 154, 154, 255),
+                           c2=(100, 100, 100, 255), s=6):
+    """
+    Return a checkered image of size width x height.
+
+    Arguments:
+        * width: image width
+        * height: image height
+        * c1: first color (RGBA)
+        * c2: second color (RGBA)
+        * s: size of the squares
+    """
+    return get_checkered_image(width, height, c1, c2, s).copy()
+
+
+def overlay(image, color):
+    """
+    Overlay a rectangle of color (RGBA) on the image and return the result.
+    """
+    from PIL import Image
+    width, height = image.size
+    im = Image.new("RGBA", (width, height), color)
+    preview = Image.alpha_composite(image, im)
+    return preview
@@ -20,11 +20,46 @@ HSV gradient bar
 """
 
 
-from tkcolorpicker.functions import tk, round2, rgb_to_hexa, hue2col
-
-
-class GradientBar(tk.Canvas):
-    """HSV gradient colorbar with selection cursor."""
+from tkcolorpicker.functions import tk
+from tkcolorpicker.core import round2, hue_strip_data, ppm_data, LRUCache
+from tkcolorpicker.notifier import Notifier
+
+# memory budget (bytes) of the hue gradient cache shared by all the
+# GradientBars of a tkinter interpreter
+CACHE_SIZE = 4 * 1024 ** 2
+
+
+def _get_hue_strip(widget, width, height):
+    """
+    Return the hue gradient image of size width x height.
+
+    The images are cached in the root window of widget, so they are shared
+    by all the GradientBars using the same tkinter interpreter.
+    """
+    root = widget._root()
+    try:
+        cache = root._tkcolorpicker_hue_strips
+    except AttributeError:
+        cache = root._tkcolorpicker_hue_strips = LRUCache(CACHE_SIZE)
+    strip = cache.get((width, height))
+    if strip is None:
+        row = tk.PhotoImage(master=root, width=width, height=1)
+        row.put(ppm_data(hue_strip_data(width), width, 1))
+        strip = row.zoom(1, height)
+        cache.put((width, height), strip, 4 * width * height)
+    return strip
+
+
+class GradientBar(tk.Canvas, Notifier):
+    """
+    HSV gradient colorbar with selection cursor.
+
+    The <<HueChanged>> event is generated once per main loop iteration in
+    which the hue changed, callbacks receiving the new hue can also be
+    registered with subscribe.
+    """
+
+    _notify_sequence = "<<HueChanged>>"
 
     def __init__(self, parent, hue=0, height=11, width=256, variable=None,
                  **kwargs):
@@ -51,69 +86,89 @@ class GradientBar(tk.Canvas):
             hue = 360
         elif hue < 0:
             hue = 0
+        self._hue = hue
+        # True while the bar writes in the variable to ignore its own trace
+        self._writing = False
         self._variable.set(hue)
+        self._init_notifier()
         try:
             self._variable.trace_add("write", self._update_hue)
         except Exception:
             self._variable.trace("w", self._update_hue)
 
-        self.gradient = tk.PhotoImage(master=self, width=width, height=height)
+        self.gradient = None
+        # the canvas items are created once and updated in place
+        self.create_image(0, 0, anchor="nw", tags="gradient")
+        self.create_line(0, 0, 0, 0, width=2, tags='cursor')
 
-        self.bind('<Configure>', lambda e: self._draw_gradient(hue))
+        self.bind('<Configure>', lambda e: self._draw_gradient(self._hue))
         self.bind('<ButtonPress-1>', self._on_click)
         self.bind('<B1-Motion>', self._on_move)
 
     def _draw_gradient(self, hue):
         """Draw the gradient and put the cursor on hue."""
-        self.delete("gradient")
-        self.delete("cursor")
-        del self.gradient
         width = self.winfo_width()
         height = self.winfo_height()
 
-        self.gradient = tk.PhotoImage(master=self, width=width, height=height)
-
-        line = []
-        for i in range(width):
-            line.append(rgb_to_hexa(*hue2col(float(i) / width * 360)))
-        line = "{" + " ".join(line) + "}"
-        self.gradient.put(" ".join([line for j in range(height)]))
-        self.create_image(0, 0, anchor="nw", tags="gradient",
-                          image=self.gradient)
-        self.lower("gradient")
+        gradient = _get_hue_strip(self, width, height)
+        if gradient is not self.gradient:
+            self.gradient = gradient
+            self.itemconfigure("gradient", image=self.gradient)
 
+        self._hue = hue
         x = hue / 360. * width
-        self.create_line(x, 0, x, height, width=2, tags='cursor')
+        self.coords('cursor', x, 0, x, height)
+
+    def check_items(self):
+        """
+        Return the number of canvas items (debugging helper).
+
+        Raise an AssertionError if the canvas does not contain exactly the
+        gradient image and the cursor.
+        """
+        nb = len(self.find_all())
+        assert nb == 2, "GradientBar contains %i canvas items instead of 2" % nb
+        return nb
 
     def _on_click(self, event):
         """Move selection cursor on click."""
-        x = event.x
-        self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(round2((360. * x) / self.winfo_width()))
+        self.set(round2((360. * event.x) / self.winfo_width()))
 
     def _on_move(self, event):
         """Make selection cursor follow the cursor."""
         w = self.winfo_width()
         x = min(max(event.x, 0), w)
-        self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(round2((360. * x) / w))
+        self.set(round2((360. * x) / w))
 
     def _update_hue(self, *args):
-        hue = int(self._variable.get())
+        """Follow the changes of the variable made outside of the bar."""
+        if self._writing:
+            return
+        try:
+            hue = int(self._variable.get())
+        except (ValueError, tk.TclError):
+            return
         if hue > 360:
             hue = 360
         elif hue < 0:
             hue = 0
         self.set(hue)
-        self.event_generate("<<HueChanged>>")
+
+    def _get_notify_value(self):
+        return self._hue
 
     def get(self):
         """Return hue of color under cursor."""
-        coords = self.coords('cursor')
-        return round2(360 * coords[0] / self.winfo_width())
+        return self._hue
 
     def set(self, hue):
         """Set cursor position on the color corresponding to the hue value."""
+        self._hue = hue
         x = hue / 360. * self.winfo_width()
         self.coords('cursor', x, 0, x, self.winfo_height())
-        self._variable.set(hue)
+        self._writing = True
+        try:
+            self._variable.set(hue)
+        finally:
+            self._writing = False
+        self._notify()
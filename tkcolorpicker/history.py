@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+tkcolorpicker - Alternative to colorchooser for Tkinter.
+Copyright 2017 Juliette Monsel <j_4321@protonmail.com>
+
+tkcolorpicker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+tkcolorpicker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Persistent history of the selected colors
+"""
+
+
+import os
+import struct
+try:
+    import fcntl
+except ImportError:
+    # no file locking (Windows): the records are still appended atomically
+    # but the log is not compacted automatically
+    fcntl = None
+
+# default number of colors in the history
+HISTORY_SIZE = 18
+# each color is stored as a 4-byte RGBA record
+RECORD_SIZE = 4
+_RECORD = struct.Struct("4B")
+# number of records read at startup, in history sizes
+TAIL_FACTOR = 4
+# the log is compacted when it contains more than COMPACT_FACTOR
+# history sizes of records
+COMPACT_FACTOR = 16
+
+try:
+    _replace = os.replace
+except AttributeError:
+    # python 2: os.rename fails on Windows when dst exists
+    def _replace(src, dst):
+        try:
+            os.rename(src, dst)
+        except OSError:
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)
+            os.rename(src, dst)
+
+
+def get_default_history_path():
+    """Return the default location of the history file."""
+    if os.name == "nt":
+        config = os.environ.get("APPDATA", os.path.expanduser("~"))
+    else:
+        config = os.environ.get("XDG_CONFIG_HOME",
+                                os.path.join(os.path.expanduser("~"), ".config"))
+    return os.path.join(config, "tkcolorpicker", "history")
+
+
+class ColorHistory(object):
+    """
+    Recently selected colors stored in an append-only file.
+
+    The file is a log of 4-byte RGBA records: adding a color appends a
+    single record and only the end of the log is read to load the history,
+    so both take a constant time. The log is compacted by rewriting the
+    history in a temporary file that replaces the log. When fcntl is
+    available, appends and compactions are serialized between processes
+    with a lock on a separate file. Otherwise, the log is only compacted
+    on demand since a concurrent append could be lost.
+    """
+
+    def __init__(self, path=None, size=HISTORY_SIZE):
+        """
+        Create a ColorHistory.
+
+        Arguments:
+            * path: history file, the default location is used if it is None
+            * size: maximum number of colors in the history
+        """
+        if path is None:
+            path = get_default_history_path()
+        self.path = path
+        self.size = size
+
+    def _makedirs(self):
+        """Create the directory of the history file if needed."""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _lock(self):
+        """Return the locked lock file (None if locking is not available)."""
+        if fcntl is None:
+            return None
+        lock = open(self.path + ".lock", "ab")
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        return lock
+
+    @staticmethod
+    def _unlock(lock):
+        if lock is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            lock.close()
+
+    def _read_tail(self, nb):
+        """Return the last nb records of the log, most recent first."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                # an interrupted write may have left an incomplete record
+                end = f.tell() // RECORD_SIZE * RECORD_SIZE
+                start = max(0, end - nb * RECORD_SIZE)
+                f.seek(start)
+                data = f.read(end - start)
+        except (IOError, OSError):
+            return []
+        records = [_RECORD.unpack_from(data, i)
+                   for i in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE)]
+        records.reverse()
+        return records
+
+    def load(self):
+        """Return the history colors (RGBA), most recent first."""
+        colors = []
+        seen = set()
+        for color in self._read_tail(self.size * TAIL_FACTOR):
+            if color not in seen:
+                seen.add(color)
+                colors.append(color)
+                if len(colors) == self.size:
+                    break
+        return colors
+
+    def add(self, color):
+        """Add color (RGB or RGBA) to the history."""
+        color = tuple(color)
+        if len(color) == 3:
+            color += (255,)
+        record = _RECORD.pack(*color)
+        self._makedirs()
+        lock = self._lock()
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+                length = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if (lock is not None and
+                    length > COMPACT_FACTOR * self.size * RECORD_SIZE):
+                self._compact()
+        finally:
+            self._unlock(lock)
+
+    def _compact(self):
+        """Rewrite the log with only the history colors (lock held)."""
+        import tempfile
+        colors = self.load()
+        colors.reverse()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or None)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"".join(_RECORD.pack(*c) for c in colors))
+            _replace(tmp, self.path)
+        except Exception:
+            os.remove(tmp)
+            raise
+
+    def compact(self):
+        """Rewrite the log with only the history colors."""
+        self._makedirs()
+        lock = self._lock()
+        try:
+            self._compact()
+        finally:
+            self._unlock(lock)
+
+    def clear(self):
+        """Remove all colors from the history."""
+        self._makedirs()
+        lock = self._lock()
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        finally:
+            self._unlock(lock)
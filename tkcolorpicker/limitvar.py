@@ -33,27 +33,79 @@ class LimitVar(tk.StringVar):
             raise ValueError("from_ and to should be integers.")
         if self._from >= self._to:
             raise ValueError("from_ should be smaller than to.")
+        # last valid value, kept up to date by a write trace so that get
+        # does not need to query tkinter
+        self._value = self._clamp(0)
+        # True while set writes the variable: the trace has nothing to parse
+        self._writing = False
+        try:
+            self.trace_add("write", self._on_write)
+        except AttributeError:
+            # Python < 3.6
+            self.trace_variable("w", self._on_write)
         # ensure that the initial value is valid
-        val = self.get()
-        self.set(val)
+        self.set(tk.StringVar.get(self))
+
+    def _clamp(self, val):
+        """Return val limited to [from_, to]."""
+        return min(max(val, self._from), self._to)
+
+    def _parse(self, value):
+        """Return the integer corresponding to value or None if invalid."""
+        try:
+            return self._clamp(int(value))
+        except (ValueError, TypeError):
+            return None
+
+    def _on_write(self, *args):
+        """Update the cached value when the variable is written."""
+        if self._writing:
+            return
+        val = self._parse(tk.StringVar.get(self))
+        if val is not None:
+            self._value = val
+
+    def validate(self, value):
+        """
+        Return whether value is an acceptable content while editing.
+
+        It is meant to be used as validatecommand (with the %P substitution)
+        of the entries and spinboxes displaying the variable: only the empty
+        string and the integers that can lead to a value between the limits
+        are accepted.
+        """
+        if not value:
+            return True
+        digits = value[1:] if value[0] == "-" else value
+        # str.isdigit also accepts unicode digits like "\u00b2" that int rejects
+        if digits and not all(c in "0123456789" for c in digits):
+            return False
+        if value[0] == "-":
+            return self._from < 0 and (not digits or -int(digits) >= self._from)
+        return int(digits) <= self._to
 
     def get(self):
         """
-        Convert the content to int between the limits of the variable.
+        Return the last valid content of the variable as an integer.
+
+        The value is cached, reading it does not query nor modify the
+        content of the variable.
+        """
+        return self._value
 
-        If the content is not an integer between the limits, the value is
-        corrected and the corrected result is returned.
+    def set(self, value):
         """
-        val = tk.StringVar.get(self)
+        Set the variable to value, limited to [from_, to].
+
+        If value is not an integer, the variable is set to 0 (or to the
+        closest limit if 0 is out of bounds).
+        """
+        val = self._parse(value)
+        if val is None:
+            val = self._clamp(0)
+        self._value = val
+        self._writing = True
         try:
-            val = int(val)
-            if val < self._from:
-                val = self._from
-                self.set(val)
-            elif val > self._to:
-                val = self._to
-                self.set(val)
-        except ValueError:
-            val = 0
-            self.set(0)
-        return val
+            tk.StringVar.set(self, val)
+        finally:
+            self._writing = False
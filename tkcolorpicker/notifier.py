@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+tkcolorpicker - Alternative to colorchooser for Tkinter.
+Copyright 2017 Juliette Monsel <j_4321@protonmail.com>
+
+tkcolorpicker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+tkcolorpicker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Coalesced change notifications of the widgets
+"""
+
+
+from collections import OrderedDict
+from itertools import count
+from time import time
+
+_ids = count()
+
+
+class _Subscription(object):
+    """Callback subscribed to the changes of a widget."""
+
+    __slots__ = ("callback", "throttle", "last_call", "after_id", "value")
+
+    def __init__(self, callback, throttle):
+        self.callback = callback
+        self.throttle = throttle
+        self.last_call = 0
+        self.after_id = None
+        self.value = None
+
+
+class Notifier:
+    """
+    Mixin for the widgets notifying value changes.
+
+    The changes made during the same main loop iteration are coalesced:
+    the virtual event and the callbacks registered with subscribe are
+    triggered only once, when tkinter is idle, with the final value.
+    The widget must define _notify_sequence (virtual event generated on
+    change, None if the widget generates it itself) and _get_notify_value
+    (immutable value passed to the callbacks).
+    """
+
+    _notify_sequence = None
+
+    def _init_notifier(self):
+        self._notify_id = None
+        # funcid: _Subscription
+        self._subscribers = OrderedDict()
+        self.bind("<Destroy>", self._on_notifier_destroy, True)
+
+    def _on_notifier_destroy(self, event):
+        if event.widget is self:
+            self._cancel_notify()
+
+    def _cancel_notify(self):
+        """Cancel the pending notifications."""
+        if self._notify_id is not None:
+            self.after_cancel(self._notify_id)
+            self._notify_id = None
+        for sub in self._subscribers.values():
+            self._cancel_subscription(sub)
+
+    def _cancel_subscription(self, sub):
+        if sub.after_id is not None:
+            self.after_cancel(sub.after_id)
+            sub.after_id = None
+
+    def _notify(self):
+        """Schedule the notification of a change."""
+        if self._notify_id is None:
+            self._notify_id = self.after_idle(self._emit)
+
+    def _emit(self):
+        """Generate the virtual event and call the subscribed callbacks."""
+        self._notify_id = None
+        if self._notify_sequence is not None:
+            self.event_generate(self._notify_sequence)
+        if not self._subscribers:
+            return
+        value = self._get_notify_value()
+        for sub in list(self._subscribers.values()):
+            if not sub.throttle:
+                sub.callback(value)
+                continue
+            sub.value = value
+            if sub.after_id is None:
+                delay = sub.throttle - 1000 * (time() - sub.last_call)
+                if delay > 0:
+                    sub.after_id = self.after(int(delay) + 1, self._call, sub)
+                else:
+                    self._call(sub)
+
+    def _call(self, sub):
+        """Call the throttled subscription sub with the last value."""
+        sub.after_id = None
+        sub.last_call = time()
+        sub.callback(sub.value)
+
+    def subscribe(self, callback, throttle=0):
+        """
+        Call callback(value) after the changes of the widget value.
+
+        Arguments:
+            * callback: function called with the new value
+            * throttle: minimum delay (in ms) between two calls of callback,
+                        the last value is always delivered
+
+        Return an identifier to be passed to unsubscribe.
+        """
+        funcid = "subscriber%i" % next(_ids)
+        self._subscribers[funcid] = _Subscription(callback, throttle)
+        return funcid
+
+    def unsubscribe(self, funcid):
+        """Remove the callback subscribed with identifier funcid."""
+        sub = self._subscribers.pop(funcid, None)
+        if sub is not None:
+            self._cancel_subscription(sub)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+tkcolorpicker - Alternative to colorchooser for Tkinter.
+Copyright 2017 Juliette Monsel <j_4321@protonmail.com>
+
+tkcolorpicker is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+tkcolorpicker is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Color palette drawn in a single image
+"""
+
+
+from tkcolorpicker.functions import tk, ttk
+from tkcolorpicker.core import round2, PALETTE, ppm_data, Color
+from tkcolorpicker.colorspec import parse_color
+
+
+class Palette(tk.Canvas):
+    """
+    Grid of color swatches.
+
+    All the visible swatches are drawn in a single image: clicks and keyboard
+    navigation are mapped to the swatches by computation and only the
+    visible rows are rendered, so large palettes stay cheap.
+    """
+
+    def __init__(self, parent, colors=PALETTE, columns=9, visible_rows=2,
+                 size=16, spacing=4, yscrollcommand=None, **kwargs):
+        """
+        Create a Palette.
+
+        Keyword arguments:
+            * parent: parent window
+            * colors: list of colors (RGB tuples, hexadecimal notation or color
+                      names, see colorspec.parse_color)
+            * columns: number of swatches per row
+            * visible_rows: number of displayed rows, the palette can be
+                            scrolled if it contains more rows
+            * size: swatch side (in pixels)
+            * spacing: space between two swatches (in pixels)
+            * yscrollcommand: command called with the visible fraction of the
+                              palette, like the one of a tkinter Canvas
+            * any keyword argument accepted by a tkinter Canvas
+        """
+        kwargs.setdefault("background",
+                          ttk.Style(parent).lookup("TFrame", "background"))
+        kwargs.setdefault("highlightthickness", 0)
+        kwargs.setdefault("takefocus", True)
+        pitch = size + spacing
+        tk.Canvas.__init__(self, parent, width=columns * pitch,
+                           height=visible_rows * pitch, **kwargs)
+        self._columns = columns
+        self._visible_rows = visible_rows
+        self._size = size
+        self._spacing = spacing
+        self._pitch = pitch
+        self._yscrollcommand = yscrollcommand
+        self._bg = self._get_rgb(self.cget("background"))
+        self._border = (128, 128, 128)
+        self._first_row = 0
+        self._focus = 0  # index of the swatch with the keyboard focus
+        self._selected = None
+        self.colors = []
+        self._rgb = []
+        # the canvas items are created once and updated in place
+        self.image = tk.PhotoImage(width=columns * pitch,
+                                   height=visible_rows * pitch, master=self)
+        self.create_image(0, 0, anchor="nw", image=self.image, tags="swatches")
+        self.create_rectangle(0, 0, 0, 0, width=1, dash=(2, 2),
+                              state="hidden", tags="cursor")
+        self.set_colors(colors)
+
+        self.bind("<ButtonPress-1>", self._on_click)
+        self.bind("<FocusIn>", self._show_cursor)
+        self.bind("<FocusOut>", self._hide_cursor)
+        self.bind("<Left>", lambda e: self._move_focus(-1))
+        self.bind("<Right>", lambda e: self._move_focus(1))
+        self.bind("<Up>", lambda e: self._move_focus(-self._columns))
+        self.bind("<Down>", lambda e: self._move_focus(self._columns))
+        self.bind("<Home>", lambda e: self._move_focus(-len(self._rgb)))
+        self.bind("<End>", lambda e: self._move_focus(len(self._rgb)))
+        self.bind("<Prior>", lambda e: self.yview("scroll", -1, "pages"))
+        self.bind("<Next>", lambda e: self.yview("scroll", 1, "pages"))
+        self.bind("<Return>", self._on_key_select)
+        self.bind("<space>", self._on_key_select)
+        self.bind("<MouseWheel>", self._on_mousewheel)
+        self.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def _get_rgb(self, color):
+        """Return the RGB value of color."""
+        try:
+            return parse_color(color)[0]
+        except ValueError:
+            # platform specific color name (e.g. SystemButtonFace)
+            return tuple(round2(c * 255 / 65535) for c in self.winfo_rgb(color))
+
+    @property
+    def rows(self):
+        """Number of rows of the palette."""
+        return (len(self._rgb) + self._columns - 1) // self._columns
+
+    def set_colors(self, colors):
+        """Replace the palette colors."""
+        self.colors = list(colors)
+        self._rgb = [tuple(self._get_rgb(c)[:3]) for c in self.colors]
+        self._first_row = 0
+        self._focus = 0
+        self._selected = None
+        self._render()
+        self._update_cursor()
+        if self._yscrollcommand is not None:
+            self._yscrollcommand(*self.yview())
+
+    # --- rendering
+    def _render(self):
+        """Draw the visible rows in the image."""
+        size = self._size
+        pitch = self._pitch
+        columns = self._columns
+        width = columns * pitch
+        bg = bytes(bytearray(self._bg))
+        border = bytes(bytearray(self._border))
+        before = bg * (self._spacing // 2)
+        after = bg * (self._spacing - self._spacing // 2)
+        blank = bg * width
+        rows = []
+        for row in range(self._first_row, self._first_row + self._visible_rows):
+            colors = self._rgb[row * columns:(row + 1) * columns]
+            if not colors:
+                rows.append(blank * pitch)
+                continue
+            fill = bg * (pitch * (columns - len(colors)))
+            edge = (before + border * size + after) * len(colors) + fill
+            inner = b"".join([before + border + bytes(bytearray(rgb)) * (size - 2) +
+                              border + after for rgb in colors]) + fill
+            rows.append(blank * (self._spacing // 2) + edge +
+                        inner * (size - 2) + edge +
+                        blank * (self._spacing - self._spacing // 2))
+        height = self._visible_rows * pitch
+        self.image.put(ppm_data(b"".join(rows), width, height))
+
+    def _update_cursor(self):
+        """Move the focus rectangle around the focused swatch."""
+        row, column = divmod(self._focus, self._columns)
+        row -= self._first_row
+        if self._rgb and 0 <= row < self._visible_rows:
+            x = column * self._pitch + self._spacing // 2
+            y = row * self._pitch + self._spacing // 2
+            self.coords("cursor", x - 1, y - 1, x + self._size, y + self._size)
+        else:
+            self.coords("cursor", 0, 0, 0, 0)
+
+    def check_items(self):
+        """
+        Return the number of canvas items (debugging helper).
+
+        Raise an AssertionError if the canvas does not contain exactly the
+        swatch image and the focus rectangle.
+        """
+        nb = len(self.find_all())
+        assert nb == 2, "Palette contains %i canvas items instead of 2" % nb
+        return nb
+
+    # --- scrolling
+    def yview(self, *args):
+        """
+        Query or change the vertical position of the palette.
+
+        Same arguments as the yview method of a tkinter Canvas.
+        """
+        rows = max(self.rows, 1)
+        if not args:
+            return (float(self._first_row) / rows,
+                    min(float(self._first_row + self._visible_rows) / rows, 1.))
+        if args[0] == "moveto":
+            first = round2(float(args[1]) * rows)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._visible_rows
+            first = self._first_row + step
+        else:
+            raise ValueError("Unknown yview command %r." % (args[0],))
+        first = max(0, min(first, self.rows - self._visible_rows))
+        if first != self._first_row:
+            self._first_row = first
+            self._render()
+            self._update_cursor()
+        if self._yscrollcommand is not None:
+            self._yscrollcommand(*self.yview())
+
+    def see(self, index):
+        """Scroll the palette so that the swatch index is visible."""
+        row = index // self._columns
+        if row < self._first_row:
+            self.yview("scroll", row - self._first_row, "units")
+        elif row >= self._first_row + self._visible_rows:
+            self.yview("scroll", row - self._first_row - self._visible_rows + 1,
+                       "units")
+
+    def _on_mousewheel(self, event):
+        self.yview("scroll", -1 if event.delta > 0 else 1, "units")
+
+    # --- selection
+    def index_at(self, x, y):
+        """Return the index of the swatch at (x, y), None if there is none."""
+        if x < 0 or y < 0:
+            return None
+        column, dx = divmod(int(x), self._pitch)
+        row, dy = divmod(int(y), self._pitch)
+        start = self._spacing // 2
+        if column >= self._columns or row >= self._visible_rows:
+            return None
+        if not (start <= dx < start + self._size and start <= dy < start + self._size):
+            return None
+        index = (row + self._first_row) * self._columns + column
+        return index if index < len(self._rgb) else None
+
+    def _show_cursor(self, event=None):
+        self.itemconfigure("cursor", state="normal")
+
+    def _hide_cursor(self, event=None):
+        self.itemconfigure("cursor", state="hidden")
+
+    def _move_focus(self, step):
+        if not self._rgb:
+            return
+        self._focus = max(0, min(self._focus + step, len(self._rgb) - 1))
+        self.see(self._focus)
+        self._update_cursor()
+
+    def _select(self, index):
+        self._focus = index
+        self._selected = index
+        self._update_cursor()
+        self.event_generate("<<ColorChanged>>")
+
+    def _on_click(self, event):
+        """Select the clicked swatch."""
+        index = self.index_at(event.x, event.y)
+        if index is not None:
+            self.focus_set()
+            self._select(index)
+
+    def _on_key_select(self, event):
+        """Select the swatch with the keyboard focus."""
+        if self._rgb:
+            self._select(self._focus)
+
+    def get(self, as_color=False):
+        """
+        Return the selected color (RGB), None if no color is selected.
+
+        If as_color is True, the color is returned as a Color.
+        """
+        if self._selected is None:
+            return None
+        if as_color:
+            return Color(*self._rgb[self._selected])
+        return self._rgb[self._selected]
+
+    def get_index(self):
+        """Return the index of the selected color, None if no color is selected."""
+        return self._selected
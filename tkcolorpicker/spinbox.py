@@ -21,6 +21,63 @@ Nicer Spinbox than the tk.Spinbox
 
 
 from tkcolorpicker.functions import tk, ttk
+from tkcolorpicker.limitvar import LimitVar
+
+# name of the ttk style shared by the frames of all the spinboxes
+STYLE = "ttkSpinbox.TFrame"
+# geometry manager methods of the spinbox applied to its frame
+_GEOMETRY_METHODS = ("pack", "pack_slaves", "pack_propagate", "pack_configure",
+                     "pack_info", "pack_forget",
+                     "grid", "grid_slaves", "grid_size", "grid_rowconfigure",
+                     "grid_remove", "grid_propagate", "grid_info",
+                     "grid_location", "grid_columnconfigure",
+                     "grid_configure", "grid_forget", "grid_bbox",
+                     "grid_anchor",
+                     "place", "place_configure", "place_forget", "place_info",
+                     "place_slaves")
+
+
+def _setup_style(widget):
+    """
+    Configure the spinbox style for the current theme and return its colors.
+
+    The style is configured only once per theme and Tk interpreter: the
+    colors looked up in the theme are cached on the root window.
+    """
+    root = widget._root()
+    try:
+        themes = root._spinbox_themes
+    except AttributeError:
+        themes = root._spinbox_themes = {}
+    style = ttk.Style(widget)
+    theme = style.theme_use()
+    try:
+        return themes[theme]
+    except KeyError:
+        pass
+    fieldbg = style.lookup("TSpinbox", "fieldbackground", default='white')
+    colors = {"selectbackground": style.lookup("TSpinbox", "selectbackground",
+                                               ("focus",)),
+              "selectforeground": style.lookup("TSpinbox", "selectforeground",
+                                               ("focus",)),
+              "background": fieldbg,
+              "foreground": style.lookup("TSpinbox", "foreground"),
+              "buttonbackground": style.lookup("TSpinbox", "background")}
+    style.configure(STYLE, background=fieldbg)
+    # the border follows the focus state of the frame
+    statespec = {}
+    for option in ("bordercolor", "darkcolor", "lightcolor"):
+        spec = []
+        for state in ("focus", "!focus"):
+            value = style.lookup("TEntry", option, (state,))
+            if value:
+                spec.append((state, value))
+        if spec:
+            statespec[option] = spec
+    if statespec:
+        style.map(STYLE, **statespec)
+    themes[theme] = colors
+    return colors
 
 
 class Spinbox(tk.Spinbox):
@@ -30,85 +87,61 @@ class Spinbox(tk.Spinbox):
         """
         Create a Spinbox.
 
-        The keyword arguments are the same as for a tk.Spinbox.
+        The keyword arguments are the same as for a tk.Spinbox. If the
+        textvariable is a LimitVar, the content is validated while editing
+        (unless a validatecommand is given).
         """
-        self.style = ttk.Style(parent)
-        self.frame = ttk.Frame(parent, class_="ttkSpinbox",
+        self.frame = ttk.Frame(parent, class_="ttkSpinbox", style=STYLE,
                                relief=kwargs.get("relief", "sunken"),
                                borderwidth=1)
-        self.style.configure("%s.spinbox.TFrame" % self.frame,
-                             background=self.style.lookup("TSpinbox",
-                                                          "fieldbackground",
-                                                          default='white'))
-        self.frame.configure(style="%s.spinbox.TFrame" % self.frame)
+        colors = _setup_style(self.frame)
         kwargs["relief"] = "flat"
         kwargs["highlightthickness"] = 0
-        kwargs["selectbackground"] = self.style.lookup("TSpinbox",
-                                                       "selectbackground",
-                                                       ("focus",))
-        kwargs["selectforeground"] = self.style.lookup("TSpinbox",
-                                                       "selectforeground",
-                                                       ("focus",))
-        kwargs["background"] = self.style.lookup("TSpinbox",
-                                                 "fieldbackground",
-                                                 default='white')
-        kwargs["foreground"] = self.style.lookup("TSpinbox",
-                                                 "foreground")
-        kwargs["buttonbackground"] = self.style.lookup("TSpinbox",
-                                                       "background")
+        kwargs.update(colors)
         tk.Spinbox.__init__(self, self.frame, **kwargs)
+        var = kwargs.get("textvariable")
+        self._limitvar = var if isinstance(var, LimitVar) else None
+        if (self._limitvar is not None and "validatecommand" not in kwargs and
+                "vcmd" not in kwargs):
+            self.configure(validate="key",
+                           validatecommand=(self.register(var.validate), "%P"))
         tk.Spinbox.pack(self, padx=1, pady=1)
         self.frame.spinbox = self
 
-        # pack/place/grid methods
-        self.pack = self.frame.pack
-        self.pack_slaves = self.frame.pack_slaves
-        self.pack_propagate = self.frame.pack_propagate
-        self.pack_configure = self.frame.pack_configure
-        self.pack_info = self.frame.pack_info
-        self.pack_forget = self.frame.pack_forget
-
-        self.grid = self.frame.grid
-        self.grid_slaves = self.frame.grid_slaves
-        self.grid_size = self.frame.grid_size
-        self.grid_rowconfigure = self.frame.grid_rowconfigure
-        self.grid_remove = self.frame.grid_remove
-        self.grid_propagate = self.frame.grid_propagate
-        self.grid_info = self.frame.grid_info
-        self.grid_location = self.frame.grid_location
-        self.grid_columnconfigure = self.frame.grid_columnconfigure
-        self.grid_configure = self.frame.grid_configure
-        self.grid_forget = self.frame.grid_forget
-        self.grid_bbox = self.frame.grid_bbox
-        try:
-            self.grid_anchor = self.frame.grid_anchor
-        except AttributeError:
-            pass
-
-        self.place = self.frame.place
-        self.place_configure = self.frame.place_configure
-        self.place_forget = self.frame.place_forget
-        self.place_info = self.frame.place_info
-        self.place_slaves = self.frame.place_slaves
-
         self.bind('<1>', lambda e: self.focus_set())
 
         self.frame.bind("<FocusIn>", self.focusin)
         self.frame.bind("<FocusOut>", self.focusout)
+        self.frame.bind("<<ThemeChanged>>", self._on_theme_changed)
+
+    def _on_theme_changed(self, event):
+        """Configure the shared style for the new theme."""
+        self.configure(**_setup_style(self.frame))
 
     def focusout(self, event):
         """Change style on focus out events."""
-        bc = self.style.lookup("TEntry", "bordercolor", ("!focus",))
-        dc = self.style.lookup("TEntry", "darkcolor", ("!focus",))
-        lc = self.style.lookup("TEntry", "lightcolor", ("!focus",))
-        self.style.configure("%s.spinbox.TFrame" % self.frame, bordercolor=bc,
-                             darkcolor=dc, lightcolor=lc)
+        self.frame.state(["!focus"])
+        var = self._limitvar
+        if var is not None and tk.Spinbox.get(self) != str(var.get()):
+            # display the last valid value instead of the edited content
+            var.set(var.get())
 
     def focusin(self, event):
         """Change style on focus in events."""
         self.old_value = self.get()
-        bc = self.style.lookup("TEntry", "bordercolor", ("focus",))
-        dc = self.style.lookup("TEntry", "darkcolor", ("focus",))
-        lc = self.style.lookup("TEntry", "lightcolor", ("focus",))
-        self.style.configure("%s.spinbox.TFrame" % self.frame, bordercolor=bc,
-                             darkcolor=dc, lightcolor=lc)
+        self.frame.state(["focus"])
+
+
+def _frame_method(name):
+    """Return a method calling the frame's method name."""
+    def method(self, *args, **kwargs):
+        return getattr(self.frame, name)(*args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = "Call %s on the frame containing the spinbox." % name
+    return method
+
+
+for _name in _GEOMETRY_METHODS:
+    if hasattr(ttk.Frame, _name):
+        setattr(Spinbox, _name, _frame_method(_name))
+del _name